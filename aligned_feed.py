@@ -0,0 +1,174 @@
+"""Time-aligned bars merged from many per-symbol streams.
+
+Each symbol's bars come from its own stream (a generator, a CSV file read in
+chunks, or a bar_store.BarStore) in time order. A heap holding one pending bar
+per stream merges them into a single sequence of timestamps, and each
+timestamp is emitted as one (symbols x columns) snapshot array. Memory is the
+heap plus the snapshot, whatever the number of symbols or length of history.
+
+    feed = AlignedBarFeed({'GLD': csv_stream('GLD.csv'), 'GDX': csv_stream('GDX.csv')},
+                          max_staleness=3)
+    for time, snapshot, fresh in feed:
+        ...
+
+Symbols without a bar at a timestamp keep their last values (forward fill),
+optionally only for max_staleness timestamps. A bar that is not newer than the
+timestamp already being emitted (a late or duplicate bar) is dropped, merged
+into the current snapshot, or rejected, depending on the late-bar policy.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from bar_store import COLUMNS
+from event_engine import BarEvent, PriceParser
+
+FILL_POLICIES = ('ffill', 'none')
+LATE_POLICIES = ('drop', 'update', 'raise')
+
+
+def frame_stream(frame, columns=COLUMNS):
+    """
+    Stream the rows of a DataFrame indexed by timestamp as (nanoseconds, values) pairs.
+    """
+
+    timestamps = pd.DatetimeIndex(frame.index).as_unit('ns').asi8.tolist()
+    return zip(timestamps, frame[list(columns)].to_numpy(dtype=float).tolist())
+
+
+def csv_stream(path, columns=COLUMNS, date_column='Date', chunksize=65536):
+    """
+    Stream a per-symbol CSV file in chunks of chunksize rows.
+    """
+
+    for chunk in pd.read_csv(path, usecols=[date_column, *columns], parse_dates=[date_column], chunksize=chunksize):
+        yield from frame_stream(chunk.set_index(date_column), columns)
+
+
+def store_stream(store, namespace, symbol, start=None, end=None, columns=COLUMNS, chunksize=65536):
+    """
+    Stream one symbol from a bar_store.BarStore, copying chunksize rows at a time
+    out of the memory-mapped columns.
+    """
+
+    bars = store.read(namespace, symbol, start, end, columns)
+    timestamps = bars['timestamp'].view(np.int64)
+    for start_row in range(0, len(timestamps), chunksize):
+        rows = slice(start_row, start_row + chunksize)
+        values = np.column_stack([bars[column][rows] for column in columns])
+        yield from zip(timestamps[rows].tolist(), values.tolist())
+
+
+class AlignedBarFeed:
+    """
+    Heap-based k-way merge of per-symbol bar streams into aligned snapshots.
+
+    Requires:
+    streams - Dict of symbol -> iterable of (timestamp, values) in time order.
+    Timestamps must be comparable across streams (the *_stream helpers yield
+    integer nanoseconds); values hold one number per column
+    columns - Names of the values, e.g. bar_store.COLUMNS
+    fill - 'ffill' to carry a symbol's last bar forward, or 'none' to give
+    symbols without a bar at a timestamp NaN
+    max_staleness - With 'ffill', how many timestamps a bar is carried forward
+    before it becomes NaN. None carries it indefinitely
+    late - What to do with a bar that is not newer than the timestamp being
+    emitted: 'drop' it, 'update' the current snapshot with it, or 'raise'
+    copy - Yield a new snapshot array each time instead of reusing one buffer
+    """
+
+    def __init__(self, streams, columns=COLUMNS, fill='ffill', max_staleness=None, late='drop', copy=False):
+        if fill not in FILL_POLICIES:
+            raise ValueError(f"Unknown fill policy '{fill}'. Expected one of {FILL_POLICIES}.")
+        if late not in LATE_POLICIES:
+            raise ValueError(f"Unknown late-bar policy '{late}'. Expected one of {LATE_POLICIES}.")
+        self.symbols = list(streams)
+        self.streams = [streams[symbol] for symbol in self.symbols]
+        self.columns = list(columns)
+        self.fill = fill
+        self.max_staleness = max_staleness
+        self.late = late
+        self.copy = copy
+        self.bars = 0
+        self.late_bars = 0
+
+    def __iter__(self):
+        """
+        Yields:
+            tuple: (timestamp, snapshot, fresh). snapshot has one row per symbol in
+            self.symbols and one column per entry in self.columns; fresh marks the
+            symbols that had a bar at this timestamp. Unless copy is set, snapshot
+            is the same array every time and is overwritten by the next timestamp.
+        """
+
+        n_symbols = len(self.symbols)
+        last = np.full((n_symbols, len(self.columns)), np.nan)
+        fresh = np.zeros(n_symbols, dtype=bool)
+        # Timestamps since each symbol's last bar.
+        age = np.full(n_symbols, np.iinfo(np.int64).max // 2, dtype=np.int64)
+        masked = self.fill == 'none' or self.max_staleness is not None
+        snapshot = np.empty_like(last) if masked else last
+        max_age = 0 if self.fill == 'none' else self.max_staleness
+
+        iterators = [iter(stream) for stream in self.streams]
+        heap = []
+        for i, iterator in enumerate(iterators):
+            self._push(heap, i, iterator, None, last, fresh)
+
+        while heap:
+            timestamp = heap[0][0]
+            fresh[:] = False
+            while heap and heap[0][0] == timestamp:
+                _, i, values = heapq.heappop(heap)
+                last[i] = values
+                fresh[i] = True
+                self.bars += 1
+                self._push(heap, i, iterators[i], timestamp, last, fresh)
+
+            age += 1
+            age[fresh] = 0
+            if masked:
+                np.copyto(snapshot, last)
+                snapshot[age > max_age] = np.nan
+            yield timestamp, (snapshot.copy() if self.copy else snapshot), fresh
+
+    def _push(self, heap, i, iterator, timestamp, last, fresh):
+        """
+        Queue the next bar of stream i that is newer than timestamp, applying the
+        late-bar policy to any that are not.
+        """
+
+        for bar_time, values in iterator:
+            if timestamp is None or bar_time > timestamp:
+                heapq.heappush(heap, (bar_time, i, values))
+                return
+
+            self.late_bars += 1
+            if self.late == 'raise':
+                raise ValueError(f"Late bar for '{self.symbols[i]}' at {bar_time}, "
+                                 f"not after the current timestamp {timestamp}.")
+            if self.late == 'update':
+                last[i] = values
+                fresh[i] = True
+                self.bars += 1
+
+    def batches(self, period=86400):
+        """
+        Yield (time, list of BarEvents) per timestamp, one event for every symbol with
+        a price in the snapshot, so an event_engine.EventDrivenBacktest can replay
+        this feed. Requires Open, High, Low, Close and Volume columns; Close is also
+        used as the adjusted close.
+        """
+
+        positions = [self.columns.index(column) for column in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        symbols = self.symbols
+        for timestamp, snapshot, _ in self:
+            time = pd.Timestamp(timestamp).to_pydatetime()
+            prices = snapshot[:, positions]
+            rows = np.flatnonzero(~np.isnan(prices[:, 3]))
+            scaled = np.round(prices[rows, :4] * PriceParser.PRICE_MULTIPLIER).astype(np.int64).tolist()
+            volumes = prices[rows, 4].tolist()
+            yield time, [BarEvent(symbols[i], time, period, *scaled[k], volumes[k], scaled[k][3])
+                         for k, i in enumerate(rows.tolist())]
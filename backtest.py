@@ -2,19 +2,47 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from performance import performance_summary
 
-def backtest(data, initial_cash=100000):
+TRADE_TYPES = np.array(['buy', 'sell', 'exit'])
+
+# Bars processed per vectorized pass. Kept bounded so that falling back to the
+# scalar path after a cash shortfall never re-scans the whole remaining history.
+_MAX_BLOCK = 1 << 16
+_MIN_BLOCK = 256
+
+
+def backtest(data, initial_cash=100000, engine='vectorized', periods_per_year=252):
     """
     Backtest the trading strategy based on generated signals.
 
     Args:
         data (DataFrame): Data containing price, signal, and optional stop-loss/take-profit levels.
         initial_cash (float): Initial cash amount for the backtest.
+        engine (str): 'vectorized' to run on NumPy arrays, or 'loop' for the
+            row-by-row reference implementation.
+        periods_per_year (int): Bars per year, to annualize the reported Sharpe ratio
+            (252 for daily bars).
 
     Returns:
         DataFrame: Updated DataFrame with portfolio metrics and trade performance.
     """
 
+    if engine == 'vectorized':
+        trades = _backtest_vectorized(data, initial_cash)
+    elif engine == 'loop':
+        trades = _backtest_loop(data, initial_cash)
+    else:
+        raise ValueError(f"Unknown backtest engine '{engine}'.")
+
+    data['Trade Returns'] = data['Portfolio Value'].pct_change()
+    _print_summary(initial_cash, data, trades, periods_per_year)
+    _plot_portfolio(data)
+
+    return data
+
+
+def _backtest_loop(data, initial_cash):
     cash, shares = initial_cash, 0
     data['Position'] = 0
     data['Portfolio Value'] = np.nan
@@ -48,14 +76,217 @@ def backtest(data, initial_cash=100000):
         data.at[i, 'Position'] = shares
         data.at[i, 'Portfolio Value'] = cash + shares * close_price
 
-    data['Trade Returns'] = data['Portfolio Value'].pct_change()
-    _print_summary(initial_cash, data, trades)
-    _plot_portfolio(data)
+    return trades
 
-    return data
+
+def _backtest_vectorized(data, initial_cash):
+    position, portfolio_value, _, trades = backtest_arrays(
+        data['Close'].to_numpy(dtype=float),
+        _optional_column(data, 'Combined_Signal'),
+        _optional_column(data, 'Stop Loss'),
+        _optional_column(data, 'Take Profit'),
+        initial_cash,
+    )
+    data['Position'] = position
+    data['Portfolio Value'] = portfolio_value
+
+    labels = data.index[trades['index']]
+    return [{'type': kind, 'price': price, 'index': label}
+            for kind, price, label in zip(trades['type'], trades['price'], labels)]
+
+
+def _optional_column(data, column):
+    return data[column].to_numpy(dtype=float) if column in data.columns else None
+
+
+def backtest_arrays(close, signal=None, stop_loss=None, take_profit=None, initial_cash=100000):
+    """
+    Array-based backtest engine following the same rules as the row-by-row loop.
+
+    Bars between two exits (a sell signal or a stop-loss/take-profit hit) are
+    simulated at once with cumulative sums. Cash is accumulated in the same
+    order as the loop, so results match it exactly. If a stretch of buy signals
+    runs out of cash, that stretch is stepped bar by bar until the next exit.
+
+    Args:
+        close (ndarray): Close prices.
+        signal (ndarray): Combined signal per bar (1 buy, -1 sell), or None.
+        stop_loss (ndarray): Stop-loss level per bar, or None.
+        take_profit (ndarray): Take-profit level per bar, or None.
+        initial_cash (float): Initial cash amount for the backtest.
+
+    Returns:
+        tuple: (position, portfolio_value, trade_returns, trades) where trades is a
+        dict of 'type', 'price' and 'index' (bar position) arrays in execution order.
+    """
+
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    signal = np.zeros(n) if signal is None else np.asarray(signal, dtype=float)
+    exit_hit = np.zeros(n, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        if stop_loss is not None:
+            stop_loss = np.asarray(stop_loss, dtype=float)
+            exit_hit |= (stop_loss != 0) & (close <= stop_loss)
+        if take_profit is not None:
+            take_profit = np.asarray(take_profit, dtype=float)
+            exit_hit |= (take_profit != 0) & (close >= take_profit)
+
+    position = np.zeros(n, dtype=np.int64)
+    portfolio_value = np.empty(n)
+    events = []
+    simulate(close, signal, exit_hit, float(initial_cash), 0, position, portfolio_value, events)
+
+    trade_returns = np.full(n, np.nan)
+    trade_returns[1:] = portfolio_value[1:] / portfolio_value[:-1] - 1
+
+    return position, portfolio_value, trade_returns, _trade_log(events)
+
+
+def simulate(close, signal, exit_hit, cash, shares, position, portfolio_value, events):
+    """
+    Run the backtest rules over a stretch of bars, starting from the given cash and shares.
+
+    Fills position and portfolio_value in place and appends (bars, kinds, prices)
+    trade arrays to events, with bars relative to the start of close. Calling it
+    on consecutive stretches with the returned state gives exactly the result of
+    one call over all of them.
+
+    Returns:
+        tuple: (cash, shares) after the last bar.
+    """
+
+    start, block = 0, _MAX_BLOCK
+    n = len(close)
+    scalar_inputs, scalar_bars = None, 0
+
+    while start < n:
+        stop = min(start + block, n)
+        done, cash, shares = _vectorized_block(close, signal, exit_hit, start, stop, cash, shares,
+                                               position, portfolio_value, events)
+        if done == stop:
+            block, scalar_bars = min(4 * block, _MAX_BLOCK), 0
+            start = done
+            continue
+
+        # A buy could not be afforded. Step through it bar by bar, and stay on the
+        # scalar path for longer while cash keeps running short shortly after.
+        if scalar_inputs is None:
+            scalar_inputs = (close.tolist(), signal.tolist(), exit_hit.tolist())
+        progress = done - start
+        block = max(2 * progress, _MIN_BLOCK)
+        scalar_bars = min(2 * scalar_bars + _MIN_BLOCK, _MAX_BLOCK) if progress < _MIN_BLOCK else 0
+        start, cash, shares = _scalar_block(*scalar_inputs, done, done + scalar_bars, cash, shares,
+                                            position, portfolio_value, events)
+
+    return cash, shares
+
+
+def _vectorized_block(close, signal, exit_hit, start, stop, cash, shares, position, portfolio_value, events):
+    """
+    Simulate bars [start, stop) assuming every buy signal can be afforded.
+
+    Returns the first bar whose buy could not be afforded (or stop) together with
+    the cash and shares held just before it.
+    """
+
+    price = close[start:stop]
+    buy = signal[start:stop] == 1
+    sell = signal[start:stop] == -1
+    closes_out = sell | exit_hit[start:stop]
+
+    # Shares held after the buy step: buys since the last close-out, plus any
+    # shares carried in if no close-out has happened yet in this block.
+    bought = np.cumsum(buy)
+    bought_at_close_out = np.maximum.accumulate(np.where(closes_out, bought, 0))
+    bought_before = np.concatenate(([0], bought_at_close_out[:-1]))
+    carried = np.where(np.cumsum(closes_out) - closes_out == 0, shares, 0)
+    held = carried + bought - bought_before
+    liquidated = closes_out & (held > 0)
+
+    # Interleave buy and liquidation cash flows so the running balance is summed
+    # in exactly the order the loop applies them.
+    flows = np.zeros(2 * len(price) + 1)
+    flows[0] = cash
+    flows[1::2] = np.where(buy, -price, 0.0)
+    flows[2::2] = np.where(liquidated, held * price, 0.0)
+    balance = np.cumsum(flows)
+
+    unaffordable = np.flatnonzero(buy & (balance[:-1:2] < price))
+    m = unaffordable[0] if unaffordable.size else len(price)
+
+    held_at_close = np.where(closes_out[:m], 0, held[:m])
+    position[start:start + m] = held_at_close
+    portfolio_value[start:start + m] = balance[2:2 * m + 1:2] + held_at_close * price[:m]
+
+    buy_bars = np.flatnonzero(buy[:m])
+    exit_bars = np.flatnonzero(liquidated[:m])
+    events.append((
+        np.concatenate((buy_bars, exit_bars)) + start,
+        np.concatenate((np.zeros(len(buy_bars), dtype=np.int8),
+                        np.where(sell[exit_bars], 1, 2).astype(np.int8))),
+        np.concatenate((price[buy_bars], price[exit_bars])),
+    ))
+
+    if m > 0:
+        shares = int(held_at_close[-1])
+    return start + m, float(balance[2 * m]), shares
+
+
+def _scalar_block(close, signal, exit_hit, start, min_stop, cash, shares, position, portfolio_value, events):
+    """
+    Step bar by bar from start until a close-out bar at or after min_stop has been processed.
+
+    Takes plain lists rather than arrays, which is much faster to index per bar.
+    """
+
+    held, values, log = [], [], []
+    i = start
+    for i in range(start, len(close)):
+        close_price = close[i]
+
+        if signal[i] == 1 and cash >= close_price:
+            shares += 1
+            cash -= close_price
+            log.append((i, 0, close_price))
+
+        elif signal[i] == -1 and shares > 0:
+            cash += shares * close_price
+            shares = 0
+            log.append((i, 1, close_price))
+
+        if shares > 0 and exit_hit[i]:
+            cash += shares * close_price
+            shares = 0
+            log.append((i, 2, close_price))
+
+        held.append(shares)
+        values.append(cash + shares * close_price)
+
+        if i >= min_stop and (signal[i] == -1 or exit_hit[i]):
+            break
+
+    position[start:i + 1] = held
+    portfolio_value[start:i + 1] = values
+    bars, kinds, prices = zip(*log) if log else ((), (), ())
+    events.append((np.array(bars, dtype=np.int64), np.array(kinds, dtype=np.int8), np.array(prices, dtype=float)))
+    return i + 1, cash, shares
+
+
+def _trade_log(events):
+    if not events:
+        return {'type': TRADE_TYPES[:0], 'price': np.empty(0), 'index': np.empty(0, dtype=np.int64)}
+
+    bars = np.concatenate([bars for bars, _, _ in events])
+    kinds = np.concatenate([kinds for _, kinds, _ in events])
+    prices = np.concatenate([prices for _, _, prices in events])
+    # A buy and a stop-loss/take-profit exit can fall on the same bar; the buy comes first.
+    order = np.lexsort((kinds, bars))
+
+    return {'type': TRADE_TYPES[kinds[order]], 'price': prices[order], 'index': bars[order]}
 
 
-def _print_summary(initial_cash, data, trades):
+def _print_summary(initial_cash, data, trades, periods_per_year=252):
     final_portfolio_value = data['Portfolio Value'].iloc[-1]
     total_return = ((final_portfolio_value / initial_cash) - 1) * 100
     print("\nBacktest Summary:")
@@ -63,6 +294,11 @@ def _print_summary(initial_cash, data, trades):
     print(f"Final Portfolio Value: ${final_portfolio_value:.2f}")
     print(f"Total Trades Executed: {len(trades)}")
     print(f"Total Return: {total_return:.2f}%")
+    metrics = performance_summary(data['Portfolio Value'].to_numpy(dtype=float), data['Position'].to_numpy(dtype=float),
+                                  periods_per_year)
+    print(f"Annualized Sharpe Ratio: {metrics['Sharpe Ratio'].iloc[0]:.2f}")
+    print(f"Max Drawdown: {100 * metrics['Max Drawdown'].iloc[0]:.2f}% "
+          f"over {metrics['Max Drawdown Duration'].iloc[0]} bars")
 
 
 def _plot_portfolio(data):
@@ -0,0 +1,308 @@
+"""Local columnar store of OHLCV bars.
+
+Each namespace (one per listing universe) is a directory holding one raw
+binary file per column plus index.json, which maps every symbol to the row
+segments it occupies. Reads memory-map the column files and slice them, so a
+read returns views into the files instead of parsing anything. Ingestion only
+ever appends: new bars for a symbol must come after its latest stored bar.
+
+    store = BarStore('bars')
+    store.append('nasdaq', 'AAPL', frame)
+    bars = store.read('nasdaq', 'AAPL', start='2024-01-01', end='2024-06-30')
+    many = store.read_many('nasdaq', ['AAPL', 'MSFT'], start='2024-01-01')
+    many['Close'][many['start'][1]:many['stop'][1]]     # MSFT closes
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Namespace -> (listing file, symbol column) for the universes data_fetcher writes.
+NAMESPACES = {
+    'nyse': ('nyse-listed.csv', 'ACT Symbol'),
+    'nasdaq': ('nasdaq-listed.csv', 'Symbol'),
+    'snp_individual': ('snp_individual.csv', 'Symbol'),
+    'etfs': ('etfs.csv', 'Symbol'),
+}
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+_INDEX = 'index.json'
+_TIMESTAMP_FILE = 'timestamp.i8'
+
+
+def load_universe(namespace, data_dir='.'):
+    """
+    Symbols listed for a namespace, read from its listing CSV.
+    """
+
+    filename, column = NAMESPACES[namespace]
+    return pd.read_csv(os.path.join(data_dir, filename))[column].dropna().astype(str).str.strip().tolist()
+
+
+class BarStore:
+    """
+    Append-only OHLCV store with memory-mapped, zero-copy range reads.
+
+    Requires:
+    root - Directory holding one sub-directory per namespace
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.indexes = {}
+        self.maps = {}
+
+    def symbols(self, namespace):
+        return list(self._index(namespace)['symbols'])
+
+    def append(self, namespace, symbol, bars):
+        """
+        Append bars for one symbol. See append_many.
+        """
+
+        self.append_many(namespace, {symbol: bars})
+
+    def append_many(self, namespace, frames):
+        """
+        Append bars for many symbols with a single index update.
+
+        Args:
+            namespace (str): Universe the symbols belong to, e.g. 'nasdaq'.
+            frames (dict): Symbol -> DataFrame indexed by timestamp with Open, High,
+                Low, Close and Volume columns.
+        """
+
+        self._check_namespace(namespace)
+        index = self._index(namespace)
+        rows = index['rows']
+        blocks = {column: [] for column in (_TIMESTAMP_FILE,) + COLUMNS}
+        new_segments = {}
+
+        for symbol, frame in frames.items():
+            if frame.empty:
+                continue
+            frame = frame.sort_index()
+            timestamps = pd.DatetimeIndex(frame.index).as_unit('ns').asi8
+            if len(np.unique(timestamps)) != len(timestamps):
+                raise ValueError(f"Duplicate timestamps in bars for '{symbol}'.")
+            segments = index['symbols'].get(symbol, [])
+            if segments and timestamps[0] <= segments[-1][3]:
+                raise ValueError(f"Bars for '{symbol}' must start after its last stored bar.")
+
+            missing = [column for column in COLUMNS if column not in frame.columns]
+            if missing:
+                raise KeyError(f"Bars for '{symbol}' are missing columns {missing}.")
+
+            blocks[_TIMESTAMP_FILE].append(timestamps)
+            for column in COLUMNS:
+                blocks[column].append(frame[column].to_numpy(dtype='<f8'))
+            new_segments[symbol] = [rows, len(frame), int(timestamps[0]), int(timestamps[-1])]
+            rows += len(frame)
+
+        if not new_segments:
+            return
+
+        # Write at the indexed row count rather than the end of file, so bytes
+        # left over from an interrupted append are overwritten.
+        path = os.path.join(self.root, namespace)
+        for column, parts in blocks.items():
+            filename = os.path.join(path, self._filename(column))
+            with open(filename, 'r+b' if os.path.exists(filename) else 'wb') as outfile:
+                outfile.seek(index['rows'] * 8)
+                outfile.write(np.concatenate(parts).tobytes())
+                outfile.truncate()
+
+        for symbol, segment in new_segments.items():
+            index['symbols'].setdefault(symbol, []).append(segment)
+        index['rows'] = rows
+        self._write_index(namespace, index)
+        self.maps.pop(namespace, None)
+
+    def read(self, namespace, symbol, start=None, end=None, columns=COLUMNS):
+        """
+        Read one symbol's bars between start and end (inclusive).
+
+        Args:
+            namespace (str): Universe the symbol belongs to.
+            symbol (str): Ticker symbol.
+            start, end: Optional window bounds, anything pd.Timestamp accepts.
+            columns (tuple): Columns to return.
+
+        Returns:
+            dict: 'timestamp' (datetime64[ns]) and one array per column. These are
+            read-only views into the store when the window falls in a single
+            segment (always the case after compact), copies otherwise.
+        """
+
+        segments = self._index(namespace)['symbols'].get(symbol)
+        if segments is None:
+            raise KeyError(f"Symbol '{symbol}' not found in namespace '{namespace}'.")
+        maps = self._maps(namespace)
+        slices = self._slices(maps, segments, *self._bounds(start, end))
+
+        result = {}
+        for column in (_TIMESTAMP_FILE,) + tuple(columns):
+            parts = [maps[column][part] for part in slices]
+            if len(parts) == 1:
+                values = parts[0]
+            elif parts:
+                values = np.concatenate(parts)
+            else:
+                values = maps[column][:0]
+            result['timestamp' if column == _TIMESTAMP_FILE else column] = values
+        result['timestamp'] = result['timestamp'].view('datetime64[ns]')
+
+        return result
+
+    def read_many(self, namespace, symbols, start=None, end=None, columns=COLUMNS):
+        """
+        Read many symbols' bars between start and end (inclusive), parsing the
+        bounds once for all of them.
+
+        Args:
+            namespace (str): Universe the symbols belong to.
+            symbols (list): Ticker symbols.
+            start, end: Optional window bounds, anything pd.Timestamp accepts.
+            columns (tuple): Columns to return.
+
+        Returns:
+            dict: 'start' and 'stop' (int64 arrays with one entry per symbol),
+            'timestamp' (datetime64[ns]) and one array per column; the bars of
+            symbols[i] are rows start[i]:stop[i] of every array. When each
+            symbol's window falls in a single segment (always the case after
+            compact) the arrays are the read-only memory maps of the whole
+            namespace and nothing is copied. Otherwise the windows are copied
+            into new arrays, one symbol after the other.
+        """
+
+        index = self._index(namespace)['symbols']
+        maps = self._maps(namespace)
+        low, high = self._bounds(start, end)
+        windows = []
+        for symbol in symbols:
+            segments = index.get(symbol)
+            if segments is None:
+                raise KeyError(f"Symbol '{symbol}' not found in namespace '{namespace}'.")
+            windows.append(self._slices(maps, segments, low, high))
+
+        names = (_TIMESTAMP_FILE,) + tuple(columns)
+        if all(len(slices) <= 1 for slices in windows):
+            bounds = np.array([(slices[0].start, slices[0].stop) if slices else (0, 0) for slices in windows],
+                              dtype=np.int64).reshape(-1, 2)
+            start, stop = bounds[:, 0], bounds[:, 1]
+            arrays = {column: maps[column] for column in names}
+        else:
+            lengths = np.array([sum(part.stop - part.start for part in slices) for slices in windows], dtype=np.int64)
+            stop = np.cumsum(lengths)
+            start = stop - lengths
+            parts = [part for slices in windows for part in slices]
+            arrays = {column: np.concatenate([maps[column][part] for part in parts]) if parts else maps[column][:0]
+                      for column in names}
+
+        result = {'start': start, 'stop': stop}
+        for column in names:
+            result['timestamp' if column == _TIMESTAMP_FILE else column] = arrays[column]
+        result['timestamp'] = result['timestamp'].view('datetime64[ns]')
+
+        return result
+
+    def read_frame(self, namespace, symbol, start=None, end=None, columns=COLUMNS):
+        """
+        read, wrapped in a DataFrame indexed by timestamp.
+        """
+
+        bars = self.read(namespace, symbol, start, end, columns)
+        return pd.DataFrame({column: bars[column] for column in columns},
+                            index=pd.DatetimeIndex(bars['timestamp'], name='Date'))
+
+    def compact(self, namespace):
+        """
+        Rewrite a namespace so every symbol occupies one contiguous segment.
+        """
+
+        index = self._index(namespace)
+        maps = self._maps(namespace)
+        path = os.path.join(self.root, namespace)
+        order = [(symbol, segments) for symbol, segments in index['symbols'].items()]
+
+        for column in (_TIMESTAMP_FILE,) + COLUMNS:
+            target = os.path.join(path, self._filename(column))
+            with open(target + '.tmp', 'wb') as outfile:
+                for _, segments in order:
+                    for offset, length, _, _ in segments:
+                        outfile.write(np.asarray(maps[column][offset:offset + length]).tobytes())
+
+        self.maps.pop(namespace, None)
+        for column in (_TIMESTAMP_FILE,) + COLUMNS:
+            target = os.path.join(path, self._filename(column))
+            os.replace(target + '.tmp', target)
+
+        offset, symbols = 0, {}
+        for symbol, segments in order:
+            length = sum(segment[1] for segment in segments)
+            symbols[symbol] = [[offset, length, segments[0][2], segments[-1][3]]]
+            offset += length
+        self._write_index(namespace, {'rows': offset, 'symbols': symbols})
+
+    @staticmethod
+    def _bounds(start, end):
+        # [low, high) in ns; end is inclusive, and timestamps are integers.
+        low = pd.Timestamp(start).as_unit('ns').value if start is not None else np.iinfo(np.int64).min
+        high = pd.Timestamp(end).as_unit('ns').value + 1 if end is not None else np.iinfo(np.int64).max
+        return low, high
+
+    @staticmethod
+    def _slices(maps, segments, low, high):
+        # Row slices of the segments that overlap [low, high), trimmed to it.
+        slices = []
+        for offset, length, first, last in segments:
+            if last < low or first >= high:
+                continue
+            lo, hi = offset, offset + length
+            if first < low or last >= high:
+                # A plain view slices much faster than the memmap subclass.
+                lo, hi = offset + maps[_TIMESTAMP_FILE].view(np.ndarray)[lo:hi].searchsorted((low, high))
+                lo, hi = int(lo), int(hi)
+            slices.append(slice(lo, hi))
+        return slices
+
+    def _check_namespace(self, namespace):
+        if namespace not in NAMESPACES:
+            raise KeyError(f"Unknown namespace '{namespace}'. Expected one of {sorted(NAMESPACES)}.")
+
+    @staticmethod
+    def _filename(column):
+        return column if column == _TIMESTAMP_FILE else f"{column.lower()}.f8"
+
+    def _index(self, namespace):
+        if namespace not in self.indexes:
+            self._check_namespace(namespace)
+            path = os.path.join(self.root, namespace, _INDEX)
+            if os.path.exists(path):
+                with open(path) as infile:
+                    self.indexes[namespace] = json.load(infile)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.indexes[namespace] = {'rows': 0, 'symbols': {}}
+        return self.indexes[namespace]
+
+    def _write_index(self, namespace, index):
+        path = os.path.join(self.root, namespace, _INDEX)
+        with open(path + '.tmp', 'w') as outfile:
+            json.dump(index, outfile)
+        os.replace(path + '.tmp', path)
+        self.indexes[namespace] = index
+
+    def _maps(self, namespace):
+        if namespace not in self.maps:
+            rows = self._index(namespace)['rows']
+            path = os.path.join(self.root, namespace)
+            maps = {}
+            for column in (_TIMESTAMP_FILE,) + COLUMNS:
+                dtype = '<i8' if column == _TIMESTAMP_FILE else '<f8'
+                maps[column] = (np.memmap(os.path.join(path, self._filename(column)), dtype=dtype, mode='r',
+                                          shape=(rows,)) if rows else np.empty(0, dtype=dtype))
+            self.maps[namespace] = maps
+        return self.maps[namespace]
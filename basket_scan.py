@@ -0,0 +1,237 @@
+"""Search S&P 500 groups for cointegrated baskets of three or more assets.
+
+Candidate baskets are drawn from within one group of snp_individual.csv:
+a GICS sector, or a share-class issuer from share_classes_snp_individual.csv.
+A basket is only a candidate if every pair in it passes a correlation
+threshold, so baskets are grown from correlated pairs instead of enumerating
+every combination, and each group and the whole search are capped. The
+surviving baskets get a Johansen trace test across a pool of worker
+processes. The first eigenvector of a cointegrated basket is returned as its
+weights, scaled so the largest weight is 1, ready to be passed to
+bollinger_bands.CointegrationBollingerBandsStrategy.
+
+    baskets = scan_baskets(prices, by='sector', basket_sizes=(3, 4))
+    best = baskets.iloc[0]
+    strategy = CointegrationBollingerBandsStrategy(list(best['Symbols']), events_queue, 15,
+                                                   np.array(best['Weights']), 1.5, 0.5, 10000)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.vector_ar.vecm import coint_johansen
+
+SNP_INDIVIDUAL_FILE = 'snp_individual.csv'
+SHARE_CLASS_FILE = 'share_classes_snp_individual.csv'
+GROUPINGS = ('sector', 'share_class')
+# Significance level -> column of the Johansen critical value tables.
+_CRITICAL_COLUMNS = {0.10: 0, 0.05: 1, 0.01: 2}
+
+RESULT_COLUMNS = ['Group', 'Symbols', 'Observations', 'Mean Correlation', 'Trace Statistic',
+                  'Critical Value', 'Rank', 'Cointegrated', 'Weights']
+
+
+def load_basket_groups(data_dir='.', by='sector'):
+    """
+    Symbols of each group baskets are drawn from.
+
+    Args:
+        data_dir (str): Directory holding snp_individual.csv and share_classes_snp_individual.csv.
+        by (str): 'sector' to group by GICS sector, or 'share_class' to group the
+            share classes of each issuer.
+
+    Returns:
+        dict: Group name -> list of symbols.
+    """
+
+    if by == 'sector':
+        snp = pd.read_csv(os.path.join(data_dir, SNP_INDIVIDUAL_FILE), index_col=0, dtype=str,
+                          keep_default_na=False)
+        groups = snp.groupby('GICS Sector', sort=True)['Symbol']
+    elif by == 'share_class':
+        share_classes = pd.read_csv(os.path.join(data_dir, SHARE_CLASS_FILE), dtype={'Symbol': str},
+                                    keep_default_na=False)
+        groups = share_classes.groupby('Issuer', sort=False)['Symbol']
+    else:
+        raise ValueError(f"Unknown grouping '{by}'. Expected one of {GROUPINGS}.")
+
+    return {str(name): pd.unique(symbols.str.strip()).tolist() for name, symbols in groups}
+
+
+def candidate_baskets(prices, groups, basket_sizes=(3,), min_correlation=0.8, min_observations=250,
+                      max_group_size=40, max_baskets_per_group=2000, max_baskets=5000):
+    """
+    Baskets within each group whose every pair of symbols is correlated.
+
+    Args:
+        prices (DataFrame): Aligned prices, one column per symbol.
+        groups (dict): Group name -> symbols, e.g. from load_basket_groups.
+        basket_sizes (tuple): Numbers of symbols per basket, each 3 or more.
+        min_correlation (float): Minimum pairwise price correlation.
+        min_observations (int): Minimum overlapping bars for a pair to count.
+        max_group_size (int): Only the max_group_size symbols of a group with the
+            most correlated partners are used.
+        max_baskets_per_group (int): Most baskets grown per group and size.
+        max_baskets (int): Most baskets returned overall, highest mean correlation first.
+
+    Returns:
+        DataFrame: 'Group', 'Symbols' (tuple) and 'Mean Correlation' per basket.
+    """
+
+    if min(basket_sizes) < 3:
+        raise ValueError(f"basket_sizes must all be 3 or more, got {tuple(basket_sizes)}.")
+
+    rows = []
+    for name, symbols in groups.items():
+        symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol in prices.columns]
+        if len(symbols) < min(basket_sizes):
+            continue
+
+        correlation = prices[symbols].corr(min_periods=min_observations).to_numpy()
+        linked = np.nan_to_num(correlation) >= min_correlation
+        np.fill_diagonal(linked, False)
+
+        # Keep the best-connected symbols, then grow baskets one symbol at a time,
+        # adding only symbols linked to every member so far.
+        keep = np.argsort(-linked.sum(axis=1), kind='stable')[:max_group_size]
+        keep = keep[linked[keep].any(axis=1)]
+        linked, correlation = linked[np.ix_(keep, keep)], correlation[np.ix_(keep, keep)]
+        symbols = [symbols[i] for i in keep]
+
+        baskets = [(i,) for i in range(len(symbols))]
+        for size in range(2, max(basket_sizes) + 1):
+            grown = []
+            for basket in baskets:
+                common = linked[list(basket)].all(axis=0)
+                common[:basket[-1] + 1] = False
+                grown.extend(basket + (j,) for j in np.flatnonzero(common).tolist())
+                if len(grown) >= max_baskets_per_group:
+                    break
+            baskets = grown[:max_baskets_per_group]
+            if size in basket_sizes:
+                for basket in baskets:
+                    block = correlation[np.ix_(basket, basket)]
+                    mean = (block.sum() - size) / (size * (size - 1))
+                    rows.append((name, tuple(symbols[i] for i in basket), mean))
+
+    result = pd.DataFrame(rows, columns=['Group', 'Symbols', 'Mean Correlation'])
+    return result.sort_values('Mean Correlation', ascending=False, kind='stable',
+                              ignore_index=True).head(max_baskets)
+
+
+def johansen_weights(prices, significance_level=0.05, det_order=0, k_ar_diff=1):
+    """
+    Johansen trace test of one basket.
+
+    Args:
+        prices (ndarray): Prices, one column per asset, without missing values.
+        significance_level (float): 0.10, 0.05 or 0.01.
+        det_order (int): Deterministic term of the test (-1 none, 0 constant, 1 trend).
+        k_ar_diff (int): Lagged differences in the VECM.
+
+    Returns:
+        tuple: (trace statistic for rank 0, its critical value, cointegration rank,
+        weights), the weights being the first eigenvector scaled so its largest
+        absolute entry is 1.
+    """
+
+    column = _CRITICAL_COLUMNS.get(significance_level)
+    if column is None:
+        raise ValueError(f"Unsupported significance level {significance_level}. "
+                         f"Expected one of {list(_CRITICAL_COLUMNS)}.")
+    result = coint_johansen(prices, det_order, k_ar_diff)
+    passed = result.lr1 > result.cvt[:, column]
+    rank = int(np.argmin(passed)) if not passed.all() else len(passed)
+    weights = result.evec[:, 0]
+    return result.lr1[0], result.cvt[0, column], rank, weights / np.abs(weights).max()
+
+
+def scan_baskets(prices, groups=None, data_dir='.', by='sector', basket_sizes=(3,), significance_level=0.05,
+                 min_correlation=0.8, min_observations=250, max_group_size=40, max_baskets_per_group=2000,
+                 max_baskets=5000, max_workers=None, chunk_size=16):
+    """
+    Rank candidate baskets by their Johansen trace statistic.
+
+    Args:
+        prices (DataFrame): Aligned prices, one column per symbol.
+        groups (dict): Group name -> symbols. Loaded with load_basket_groups if None.
+        data_dir (str): Directory holding the S&P 500 files.
+        by (str): Grouping passed to load_basket_groups.
+        basket_sizes (tuple): Numbers of symbols per basket, each 3 or more.
+        significance_level (float): 0.10, 0.05 or 0.01.
+        min_correlation, min_observations, max_group_size, max_baskets_per_group,
+        max_baskets: Pruning limits, see candidate_baskets.
+        max_workers (int): Worker processes. Defaults to the CPU count; 1 runs in-process.
+        chunk_size (int): Baskets sent to a worker per task.
+
+    Returns:
+        DataFrame: Tested baskets, strongest first (trace statistic over critical
+        value), with the cointegration rank and the 'Weights' tuple in the order
+        of 'Symbols'.
+    """
+
+    if significance_level not in _CRITICAL_COLUMNS:
+        raise ValueError(f"Unsupported significance level {significance_level}. "
+                         f"Expected one of {list(_CRITICAL_COLUMNS)}.")
+    if groups is None:
+        groups = load_basket_groups(data_dir, by)
+    candidates = candidate_baskets(prices, groups, basket_sizes, min_correlation, min_observations,
+                                   max_group_size, max_baskets_per_group, max_baskets)
+    if candidates.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    # Workers receive the price matrix once, and each task only column indices,
+    # so no per-basket copies of the prices are built up front.
+    columns = {symbol: i for i, symbol in enumerate(prices.columns)}
+    baskets = [tuple(columns[symbol] for symbol in symbols) for symbols in candidates['Symbols']]
+    tasks = [(baskets[lo:lo + chunk_size], significance_level, min_observations)
+             for lo in range(0, len(baskets), chunk_size)]
+    values = prices.to_numpy(dtype=float)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        _set_prices(values)
+        try:
+            results = [_test_chunk(task) for task in tasks]
+        finally:
+            _set_prices(None)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_set_prices,
+                                 initargs=(values,)) as executor:
+            results = list(executor.map(_test_chunk, tasks))
+
+    tested = [row for chunk in results for row in chunk]
+    candidates['Observations'] = [row[0] for row in tested]
+    candidates['Trace Statistic'] = [row[1] for row in tested]
+    candidates['Critical Value'] = [row[2] for row in tested]
+    candidates['Rank'] = [row[3] for row in tested]
+    candidates['Weights'] = [row[4] for row in tested]
+    candidates['Cointegrated'] = candidates['Rank'] > 0
+
+    strength = candidates['Trace Statistic'] / candidates['Critical Value']
+    order = np.argsort(-strength.fillna(-np.inf).to_numpy(), kind='stable')
+    return candidates.iloc[order].reset_index(drop=True)[RESULT_COLUMNS]
+
+
+_prices = None
+
+
+def _set_prices(values):
+    global _prices
+    _prices = values
+
+
+def _test_chunk(task):
+    baskets, significance_level, min_observations = task
+    results = []
+    for basket in baskets:
+        values = _prices[:, list(basket)]
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values) < max(min_observations, 2 * values.shape[1] + 3):
+            results.append((len(values), np.nan, np.nan, 0, None))
+            continue
+        trace, critical, rank, weights = johansen_weights(values, significance_level)
+        results.append((len(values), trace, critical, rank, tuple(weights.tolist())))
+    return results
@@ -1,10 +1,7 @@
 from __future__ import print_function
-from collections import deque
 from math import floor
 import numpy as np
-from import qstrader
-from qstrader.event import (SignalEvent, EventType)
-from qstrader.strategy.base import AbstractStrategy
+from event_engine import (AbstractStrategy, EventType, PriceParser, SignalEvent)
 
 class CointegrationBollingerBandsStrategy(AbstractStrategy):
     """
@@ -28,11 +25,27 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
         self.exit_z = exit_z
         self.qty = base_quantity
         self.time = None
-        self.latest_prices = np.full(len(self.tickers), -1.0)
-        self.port_mkt_val = deque(maxlen=self.lookback)
         self.invested = None
         self.bars_elapsed = 0
 
+        # Ticker -> slot in latest_prices. A slot holds a price for the
+        # current time only if its stamp equals bars_elapsed, so a new
+        # timestamp needs no reset of the price array.
+        self.slots = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.slot_weights = [float(weight) for weight in self.weights]
+        self.latest_prices = np.full(len(self.tickers), -1.0)
+        self.stamps = [-1] * len(self.tickers)
+        self.prices_missing = len(self.tickers)
+        self.port_value = 0.0
+
+        # Ring buffer of the last lookback portfolio market values, with
+        # their running mean and sum of squared deviations (Welford).
+        self.port_mkt_val = [0.0] * self.lookback
+        self.position = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
     def _set_correct_time_and_price(self, event):
         """
         Sets the correct price and event time for prices
@@ -41,20 +54,49 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
         # Set the first instance of time
         if self.time is None:
             self.time = event.time
+        if event.time != self.time:
+            self.time = event.time
+            self.bars_elapsed += 1
+            self.prices_missing = len(self.tickers)
+            self.port_value = 0.0
+
         # Set the correct latest prices depending upon
         # order of arrival of market bar event
+        slot = self.slots.get(event.ticker)
+        if slot is None:
+            return
         price = event.adj_close_price/float(PriceParser.PRICE_MULTIPLIER)
-        if event.time == self.time:
-            for i in range(0, len(self.tickers)):
-            if event.ticker == self.tickers[i]:
-            self.latest_prices[i] = price
+        if self.stamps[slot] == self.bars_elapsed:
+            self.port_value -= self.slot_weights[slot] * self.latest_prices[slot]
         else:
-        self.time = event.time
-        self.bars_elapsed += 1
-        self.latest_prices = np.full(len(self.tickers), -1.0)
-        for i in range(0, len(self.tickers)):
-            if event.ticker == self.tickers[i]:
-                self.latest_prices[i] = price
+            self.stamps[slot] = self.bars_elapsed
+            self.prices_missing -= 1
+        self.latest_prices[slot] = price
+        self.port_value += self.slot_weights[slot] * price
+
+    def _append_market_value(self, value):
+        """
+        Push a portfolio market value into the ring buffer, updating the
+        running mean and sum of squared deviations in constant time.
+        """
+        if self.count < self.lookback:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        else:
+            oldest = self.port_mkt_val[self.position]
+            previous_mean = self.mean
+            delta = value - oldest
+            self.mean += delta / self.lookback
+            self.m2 += delta * (value - self.mean + oldest - previous_mean)
+
+        self.port_mkt_val[self.position] = value
+        self.position = (self.position + 1) % self.lookback
+        # Recompute from the buffer once per lap so rounding error cannot build up.
+        if self.position == 0:
+            self.mean = sum(self.port_mkt_val) / self.lookback
+            self.m2 = sum((x - self.mean) ** 2 for x in self.port_mkt_val)
 
     def go_long_units(self):
         """
@@ -67,10 +109,10 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
                 self.events_queue.put(SignalEvent(
                     ticker, "SLD",
                     int(floor(-1.0*self.qty*self.weights[i]))))
-        else:
-            self.events_queue.put(SignalEvent(
-                ticker, "BOT",
-                int(floor(self.qty*self.weights[i]))))
+            else:
+                self.events_queue.put(SignalEvent(
+                    ticker, "BOT",
+                    int(floor(self.qty*self.weights[i]))))
 
 
     def go_short_units(self):
@@ -85,11 +127,11 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
                     ticker, "BOT",
                     int(floor(-1.0*self.qty*self.weights[i])))
                 )
-        else:
-            self.events_queue.put(SignalEvent(
-                ticker, "SLD",
-                int(floor(self.qty*self.weights[i])))
-            )
+            else:
+                self.events_queue.put(SignalEvent(
+                    ticker, "SLD",
+                    int(floor(self.qty*self.weights[i])))
+                )
 
     def zscore_trade(self, zscore, event):
         """
@@ -99,12 +141,12 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
         # If we’re not in the market...
         if self.invested is None:
             if zscore < -self.entry_z:
-        # Long Entry
-            print("LONG: %s" % event.time)
-            self.go_long_units()
-            self.invested = "long"
+                # Long Entry
+                print("LONG: %s" % event.time)
+                self.go_long_units()
+                self.invested = "long"
             elif zscore > self.entry_z:
-        # Short Entry
+                # Short Entry
                 print("SHORT: %s" % event.time)
                 self.go_short_units()
                 self.invested = "short"
@@ -114,10 +156,10 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
                 print("CLOSING LONG: %s" % event.time)
                 self.go_short_units()
                 self.invested = None
-        elif self.invested == "short" and zscore <= self.exit_z:
-            print("CLOSING SHORT: %s" % event.time)
-            self.go_long_units()
-            self.invested = None
+            elif self.invested == "short" and zscore <= self.exit_z:
+                print("CLOSING SHORT: %s" % event.time)
+                self.go_long_units()
+                self.invested = None
 
     def calculate_signals(self, event):
         """
@@ -125,12 +167,20 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
         """
         if event.type == EventType.BAR:
             self._set_correct_time_and_price(event)
-        # Only trade if we have all prices
-        if all(self.latest_prices > -1.0):
-        # Calculate portfolio market value via dot product
-        # of ETF prices with portfolio weights
-            self.port_mkt_val.append(np.dot(self.latest_prices, self.weights))
-        if self.bars_elapsed > self.lookback:
-                zscore = ((self.port_mkt_val[-1] - np.mean(self.port_mkt_val)) /
-                          np.std(self.port_mkt_val)
-                self.zscore_trade(zscore, event)
+            # Only trade if we have all prices
+            if self.prices_missing == 0:
+                # Portfolio market value, the dot product of the
+                # latest prices with the portfolio weights, is kept
+                # up to date as each price arrives
+                self._append_market_value(self.port_value)
+                if self.bars_elapsed > self.lookback:
+                    # Population standard deviation, as np.std
+                    std = np.sqrt(max(self.m2, 0.0) / self.count)
+                    zscore = (self.port_value - self.mean) / std
+                    self.zscore_trade(zscore, event)
+
+
+if __name__ == "__main__":
+    # Imported from event_engine, so the strategy and the engine share one EventType.
+    from event_engine import benchmark
+    benchmark()
@@ -0,0 +1,182 @@
+"""Scan the share-class universes for cointegrated pairs.
+
+Candidate pairs come from the share_classes_*.csv files written by
+data_fetcher.find_share_classes. They are pre-screened with a vectorized
+correlation filter, and the surviving pairs are tested with Engle-Granger
+across a pool of worker processes.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from cointegration import test_cointegration
+
+SHARE_CLASS_FILES = {
+    'nasdaq': 'share_classes_nasdaq.csv',
+    'nyse': 'share_classes_nyse.csv',
+    'snp_individual': 'share_classes_snp_individual.csv',
+}
+
+RESULT_COLUMNS = ['Universe', 'Symbol A', 'Symbol B', 'Observations', 'Correlation',
+                  'Hedge Ratio', 'Intercept', 'P-Value', 'Cointegrated']
+
+
+def load_share_class_pairs(data_dir='.', universes=None):
+    """
+    Build every candidate pair from the share-class files.
+
+    Each 'Group ID' in the files is one issuer, and every two-symbol combination
+    within it is a candidate. Files written before group IDs existed list share
+    classes as runs of consecutive rows whose names start with the same word,
+    and each run is treated as one issuer.
+
+    Args:
+        data_dir (str): Directory holding the share_classes_*.csv files.
+        universes (list): Universes to load (keys of SHARE_CLASS_FILES). All by default.
+
+    Returns:
+        DataFrame: One row per candidate pair with 'Universe', 'Symbol A' and 'Symbol B'.
+    """
+
+    pairs = []
+    for universe in universes or SHARE_CLASS_FILES:
+        df = pd.read_csv(os.path.join(data_dir, SHARE_CLASS_FILES[universe]))
+        symbols = df.iloc[:, 0].astype(str).str.strip()
+        if 'Group ID' in df.columns:
+            group_ids = df['Group ID']
+        else:
+            first_words = df.iloc[:, 1].astype(str).str.strip('"').str.split().str[0]
+            group_ids = (first_words != first_words.shift()).cumsum()
+
+        for group in symbols.groupby(group_ids, sort=False):
+            members = pd.unique(group[1])
+            pairs.extend((universe, a, b) for a, b in combinations(members, 2))
+
+    return pd.DataFrame(pairs, columns=['Universe', 'Symbol A', 'Symbol B']).drop_duplicates(ignore_index=True)
+
+
+def prescreen_pairs(prices, pairs, min_correlation=0.9, min_observations=30, chunk_size=4096):
+    """
+    Cheap vectorized filter run before the Engle-Granger tests.
+
+    Computes the correlation of the two price series and the OLS hedge ratio of
+    Symbol A on Symbol B for many pairs at once, using only the bars where both
+    prices exist.
+
+    Args:
+        prices (DataFrame): Aligned prices, one column per symbol.
+        pairs (DataFrame): Candidate pairs with 'Symbol A' and 'Symbol B' columns.
+        min_correlation (float): Minimum correlation for a pair to be kept.
+        min_observations (int): Minimum number of overlapping bars.
+        chunk_size (int): Pairs processed per vectorized block.
+
+    Returns:
+        DataFrame: The surviving pairs with 'Observations', 'Correlation',
+        'Hedge Ratio' and 'Intercept' columns added.
+    """
+
+    pairs = pairs[pairs['Symbol A'].isin(prices.columns) & pairs['Symbol B'].isin(prices.columns)]
+    pairs = pairs.reset_index(drop=True)
+    values = prices.to_numpy(dtype=float)
+    column = {symbol: i for i, symbol in enumerate(prices.columns)}
+    idx_a = pairs['Symbol A'].map(column).to_numpy(dtype=np.int64)
+    idx_b = pairs['Symbol B'].map(column).to_numpy(dtype=np.int64)
+
+    stats = np.full((len(pairs), 4), np.nan)
+    for lo in range(0, len(pairs), chunk_size):
+        a = values[:, idx_a[lo:lo + chunk_size]]
+        b = values[:, idx_b[lo:lo + chunk_size]]
+        valid = ~(np.isnan(a) | np.isnan(b))
+        a, b = np.where(valid, a, 0.0), np.where(valid, b, 0.0)
+
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_a, mean_b = a.sum(axis=0) / count, b.sum(axis=0) / count
+            da, db = np.where(valid, a - mean_a, 0.0), np.where(valid, b - mean_b, 0.0)
+            cov = (da * db).sum(axis=0)
+            var_a, var_b = (da * da).sum(axis=0), (db * db).sum(axis=0)
+            slope = cov / var_b
+            stats[lo:lo + chunk_size] = np.column_stack((
+                count, cov / np.sqrt(var_a * var_b), slope, mean_a - slope * mean_b))
+
+    pairs[['Observations', 'Correlation', 'Hedge Ratio', 'Intercept']] = stats
+    pairs['Observations'] = pairs['Observations'].astype(np.int64)
+    keep = (pairs['Observations'] >= min_observations) & (pairs['Correlation'] >= min_correlation)
+
+    return pairs[keep].reset_index(drop=True)
+
+
+def scan_cointegration(prices, pairs=None, data_dir='.', significance_level=0.05, min_correlation=0.9,
+                       min_observations=30, max_workers=None, chunk_size=16):
+    """
+    Rank share-class pairs by Engle-Granger cointegration p-value.
+
+    Args:
+        prices (DataFrame): Aligned prices, one column per symbol.
+        pairs (DataFrame): Candidate pairs with 'Symbol A' and 'Symbol B' columns and
+            optionally 'Universe'. Loaded from the share-class files if None.
+        data_dir (str): Directory holding the share_classes_*.csv files.
+        significance_level (float): Significance level for the cointegration test.
+        min_correlation (float): Pre-screen correlation threshold.
+        min_observations (int): Minimum number of overlapping bars per pair.
+        max_workers (int): Worker processes. Defaults to the CPU count; 1 runs in-process.
+        chunk_size (int): Pairs sent to a worker per task.
+
+    Returns:
+        DataFrame: Tested pairs sorted by p-value, with hedge ratios, in
+        RESULT_COLUMNS ('Universe' only when pairs has it).
+    """
+
+    if pairs is None:
+        pairs = load_share_class_pairs(data_dir)
+    candidates = prescreen_pairs(prices, pairs, min_correlation, min_observations)
+    if candidates.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    # Workers receive the price matrix once, and each task only column indices.
+    columns = {symbol: i for i, symbol in enumerate(prices.columns)}
+    pairs = [(columns[a], columns[b]) for a, b in zip(candidates['Symbol A'], candidates['Symbol B'])]
+    tasks = [(pairs[lo:lo + chunk_size], significance_level) for lo in range(0, len(pairs), chunk_size)]
+    values = prices.to_numpy(dtype=float)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        _set_prices(values)
+        try:
+            results = [_test_chunk(task) for task in tasks]
+        finally:
+            _set_prices(None)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_set_prices,
+                                 initargs=(values,)) as executor:
+            results = list(executor.map(_test_chunk, tasks))
+
+    tested = np.array([row for chunk in results for row in chunk], dtype=float).reshape(-1, 2)
+    candidates['P-Value'] = tested[:, 0]
+    candidates['Cointegrated'] = tested[:, 1].astype(bool)
+
+    columns = [column for column in RESULT_COLUMNS if column in candidates.columns]
+    return candidates.sort_values('P-Value', ignore_index=True)[columns]
+
+
+_prices = None
+
+
+def _set_prices(values):
+    global _prices
+    _prices = values
+
+
+def _test_chunk(task):
+    pairs, significance_level = task
+    results = []
+    for i, j in pairs:
+        a, b = _prices[:, i], _prices[:, j]
+        valid = ~(np.isnan(a) | np.isnan(b))
+        is_cointegrated, p_value = test_cointegration(a[valid], b[valid], significance_level)
+        results.append((p_value, is_cointegrated))
+    return results
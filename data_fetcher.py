@@ -27,50 +27,65 @@ Modifications by Erin Xu, 2025.
     Data Source: ftp://ftp.nasdaqtrader.com/symboldirectory/
     Data Documentation: http://www.nasdaqtrader.com/trader.aspx?id=symboldirdefs"""
 
+import numpy as np
 import pandas as pd
+import io
 import json
 import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from etfpy import ETF, load_etf, get_available_etfs_list
 
 PACKAGE_NAME = 'nyse-listings'
 PACKAGE_TITLE = 'NYSE Listings'
 
-NYSE_URL = 'ftp://ftp.nasdaqtrader.com/symboldirectory/otherlisted.txt'
+# The same file as ftp://ftp.nasdaqtrader.com/symboldirectory/otherlisted.txt, over HTTPS.
+NYSE_URL = 'https://www.nasdaqtrader.com/dynamic/symdir/otherlisted.txt'
 NASDAQ_URL = 'https://www.nasdaqtrader.com/dynamic/symdir/nasdaqlisted.txt'
 SNP_INDIVIDUAL_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies#S&P_500_component_stocks'
 SNP_SECTOR_URL = 'https://www.spglobal.com/spdji/en/index-family/equity/us-equity/sp-sectors/#indices'
 
-def process_nasdaq():
-    try:
-        resp = requests.get(NASDAQ_URL)
-
-        data = resp.text.split('\n')
-        data = [row.split('|') for row in data]
-        df = pd.DataFrame(data[1:], columns=data[0])
+REQUEST_TIMEOUT = (5, 30)  # Connect and read timeouts in seconds
+MAX_RETRIES = 3
+VALIDATORS_FILE = 'listings_validators.json'
 
-        # Transform data
-        df.columns = df.columns.str.replace('\r', '', regex=False)
-        df = df.map(lambda x: x.replace('\r', '') if isinstance(x, str) else x)
+def process_nasdaq(session=None):
+    try:
+        resp = (session or requests).get(NASDAQ_URL, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
 
         # Create nasdaq_listed.csv
-        nasdaq_listed = df[['Symbol', 'Security Name']]
+        nasdaq_listed = _parse_nasdaq(resp.text)
         nasdaq_listed.to_csv('data/nasdaq-listed.csv', index=False)
-        nasdaq_listed_symbol = df
-        nasdaq_listed_symbol['Company Name'] = nasdaq_listed_symbol['Security Name'].str.split(' - ').str[0].str.replace("",'').str.strip()
         print('nasdaq-listed.csv saved.')
 
     except Exception as e:
         print(f"Error fetching/saving NASDAQ data: {e}")
 
-def process_nyse():
-    try:
-        # Load the data from the provided FTP link
-        other = pd.read_csv(NYSE_URL, sep='|')
 
-        # Clean the data and filter for NYSE only
-        other = _clean_data(other)
-        nyse = other[other['Exchange'] == 'N'][['ACT Symbol', 'Company Name']]  # NYSE Only
+def _parse_nasdaq(text):
+    listing = _normalized_listing(text, ['Symbol', 'Security Name'])
+    if listing is not None:
+        return listing
+
+    data = text.split('\n')
+    data = [row.split('|') for row in data]
+    df = pd.DataFrame(data[1:], columns=data[0])
+
+    # Transform data
+    df.columns = df.columns.str.replace('\r', '', regex=False)
+    df = df.map(lambda x: x.replace('\r', '') if isinstance(x, str) else x)
+
+    return df[['Symbol', 'Security Name']]
+
+def process_nyse(session=None):
+    try:
+        resp = (session or requests).get(NYSE_URL, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
+        nyse = _parse_nyse(resp.text)
 
         # Ensure data directory exists
         os.makedirs('data', exist_ok=True)
@@ -87,6 +102,42 @@ def process_nyse():
         print(f"Error fetching/saving NYSE data: {e}")
 
 
+def _parse_nyse(text):
+    listing = _normalized_listing(text, ['ACT Symbol', 'Company Name'])
+    if listing is not None:
+        return listing
+
+    other = pd.read_csv(io.StringIO(text), sep='|')
+
+    # Clean the data and filter for NYSE only
+    other = _clean_data(other)
+    return other[other['Exchange'] == 'N'][['ACT Symbol', 'Company Name']]  # NYSE Only
+
+
+def _normalized_listing(text, columns, index=False):
+    """
+    Read text as an already-normalized listing CSV, such as the files in the data
+    directory served by a local mirror or test server.
+
+    Args:
+        text (str): Response body.
+        columns (list): Columns of the normalized listing.
+        index (bool): Whether the listing is written with an unnamed index column first.
+
+    Returns:
+        DataFrame: The listing, or None if text is not in the normalized format.
+    """
+
+    header = text.lstrip('\ufeff').split('\n', 1)[0].rstrip('\r')
+    if header != ','.join([''] * index + columns):
+        return None
+
+    listing = pd.read_csv(io.StringIO(text), index_col=0 if index else None, dtype=str, keep_default_na=False)
+    if list(listing.columns) != columns:
+        raise ValueError(f"Normalized listing has columns {list(listing.columns)}, expected {columns}.")
+    return listing
+
+
 def _clean_data(df):
     df = df.copy()
 
@@ -137,11 +188,11 @@ def _create_datapackage(datasets):
         'resources': resources,
     }
 
-def process_snp500_individual():
+def process_snp500_individual(session=None):
     try:
-        df = pd.read_html(SNP_INDIVIDUAL_URL, header=0)[0]
-        columns_to_remove = ["GICS Sub-Industry", "Headquarters Location", "Date added", "CIK", "Founded"]  # Replace with the column names you want to drop
-        df = df.drop(columns=columns_to_remove)
+        resp = (session or requests).get(SNP_INDIVIDUAL_URL, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
+        df = _parse_snp500_individual(resp.text)
 
         df.to_csv('data/snp_individual.csv')
         print('snp_individual.csv saved.')
@@ -150,6 +201,15 @@ def process_snp500_individual():
         print(f"Error fetching/saving S&P 500 individual indexes: {e}")
         return None
 
+def _parse_snp500_individual(text):
+    listing = _normalized_listing(text, ['Symbol', 'Security', 'GICS Sector'], index=True)
+    if listing is not None:
+        return listing
+
+    df = pd.read_html(io.StringIO(text), header=0)[0]
+    columns_to_remove = ["GICS Sub-Industry", "Headquarters Location", "Date added", "CIK", "Founded"]  # Replace with the column names you want to drop
+    return df.drop(columns=columns_to_remove)
+
 def process_etfs():
     etfs_list = get_available_etfs_list()
     df = pd.DataFrame(etfs_list, columns=["Symbol"])
@@ -157,71 +217,425 @@ def process_etfs():
 
     print("etfs.csv saved.")
 
-def find_share_classes():
+# Listing file -> (share-class output file, symbol column, name column)
+SHARE_CLASS_LISTINGS = {
+    'nasdaq-listed.csv': ('share_classes_nasdaq.csv', 'Symbol', 'Security Name'),
+    'nyse-listed.csv': ('share_classes_nyse.csv', 'ACT Symbol', 'Company Name'),
+    'snp_individual.csv': ('share_classes_snp_individual.csv', 'Symbol', 'Security'),
+}
+
+# Everything from the first security descriptor on, e.g. "- Class A Common Stock" or
+# "Units, each consisting of ...", is not part of the issuer's name.
+_SECURITY_DESCRIPTOR = (r'\s(?:-\s|\(|Class [A-Z]\b|Series [A-Z0-9]+\b|\d+(?:\.\d+)?%|'
+                        r'(?i:(?:New\s+)?Common\s+(?:Stock|Shares?|Units?)|Ordinary\s+Shares?|'
+                        r'Shares?\s+of\s+Beneficial\s+Interest|American\s+Deposit[ao]ry|Depositary|Depository|'
+                        r'Units?|Warrants?|Rights?|Subunits?|(?:Preferred|Preference)\s+(?:Stock|Shares?)|'
+                        r'(?:Senior\s+|Subordinated\s+)+(?:Notes?|Debentures?)|Notes?\s+due|Subordinated|Debentures?|'
+                        r'Non[- ]?Cumulative|Cumulative|Perpetual|Redeemable)\b).*$')
+# Words that also occur inside issuer names ("Leverage Shares 2X Long ... ETF",
+# "Brookdale Senior Living"), so they are only stripped as a run at the end of the name.
+_TRAILING_DESCRIPTOR = r'(?i:\s(?:Common|Ordinary|Shares?|New|Preferred|Preference|Senior|Notes?|Fixed|Floating|Rate))+$'
+_LEGAL_SUFFIX = r'(?:\s(?:&|inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|lp|l p|sa|nv|ag|se))+$'
+
+
+def normalize_issuer(names):
+    """
+    Reduce security names to an issuer key, so every class of one issuer maps to
+    the same string: "Abacus Life, Inc. - Class A Common Stock" and
+    "Abacus Life, Inc. - Warrant" both become "abacus life".
+
+    Args:
+        names (Series): Security or company names.
+
+    Returns:
+        Series: Lower-case issuer keys, NaN where nothing is left of the name.
+    """
+
+    names = names.astype(str).str.strip().str.strip('"')
+    issuer = names.str.replace(_SECURITY_DESCRIPTOR, '', regex=True).str.replace(_TRAILING_DESCRIPTOR, '', regex=True)
+    issuer = issuer.str.lower()
+    issuer = issuer.str.replace(r'[^0-9a-z&]+', ' ', regex=True).str.strip()
+    issuer = issuer.str.replace(_LEGAL_SUFFIX, '', regex=True).str.replace(r'^the\s', '', regex=True)
+    return issuer.where(issuer != '')
+
+
+def group_share_classes(listing, symbol_column, name_column):
+    """
+    Group the symbols of any listing by issuer.
+
+    Issuer keys are hashed into groups, so classes are found wherever they sit
+    in the file, in a single pass.
+
+    Args:
+        listing (DataFrame): Listing with one row per symbol.
+        symbol_column (str): Column holding the ticker symbol.
+        name_column (str): Column holding the security or company name.
+
+    Returns:
+        DataFrame: symbol_column, name_column, 'Issuer' and 'Group ID' for every
+        symbol whose issuer has at least two distinct symbols, one row per symbol,
+        ordered by group. Group IDs number the groups from 0 in order of first
+        appearance in the listing.
+    """
+
+    df = listing[[symbol_column, name_column]].dropna()
+    df = df.assign(**{symbol_column: df[symbol_column].astype(str).str.strip()})
+    df = df.drop_duplicates(subset=symbol_column)
+    issuer = normalize_issuer(df[name_column])
+
+    codes, _ = pd.factorize(issuer)
+    sizes = np.bincount(codes[codes >= 0], minlength=1)
+    in_group = (codes >= 0) & (sizes[np.maximum(codes, 0)] > 1)
+
+    groups = df[in_group].assign(Issuer=issuer[in_group])
+    groups['Group ID'] = pd.factorize(groups['Issuer'])[0]
+    return groups.sort_values('Group ID', kind='stable').reset_index(drop=True)
+
+
+def find_share_classes(data_dir='data'):
     """
     for  stocks, indexes and etfs
     store in "share_classes_[equity type].csv"
     """
-    df_nasdaq = pd.read_csv("data/nasdaq-listed.csv")
-    df_nasdaq['Security Name'] = df_nasdaq['Security Name'].astype(str).str.strip('"').str.strip()
-    df_nasdaq.to_csv("data/nasdaq-listed.csv", index=False)
-    matches_nasdaq = []
-    for i in range(len(df_nasdaq) - 1):
-        current_name = df_nasdaq.loc[i, 'Security Name']
-        previous_name = df_nasdaq.loc[i + 1, 'Security Name']
+    for filename, (output, symbol_column, name_column) in SHARE_CLASS_LISTINGS.items():
+        path = os.path.join(data_dir, filename)
+        listing = pd.read_csv(path, index_col=0 if filename == 'snp_individual.csv' else None)
+        if filename == 'nasdaq-listed.csv':
+            listing[name_column] = listing[name_column].astype(str).str.strip('"').str.strip()
+            listing.to_csv(path, index=False)
 
-        current_first_word = current_name.split()[0]
-        previous_first_word = previous_name.split()[0]
+        groups = group_share_classes(listing, symbol_column, name_column)
+        groups.to_csv(os.path.join(data_dir, output), index=False)
+        print(f"{groups['Group ID'].nunique()} share-class groups saved to {output}")
 
-        if current_first_word == previous_first_word:
-            matches_nasdaq.append(df_nasdaq.loc[i, ['Symbol', 'Security Name']])
-            matches_nasdaq.append(df_nasdaq.loc[i + 1, ['Symbol', 'Security Name']])
 
-    matches_df_nasdaq = pd.DataFrame(matches_nasdaq)
-    matches_df_nasdaq.to_csv("data/share_classes_nasdaq.csv", index=False)
-    print(f"Matches saved to share_classes_nasdaq.csv")
+def update_listings(data_dir='data'):
+    """
+    Bring share classes and datapackage.json up to date with the listing files,
+    doing work only for what changed since the last run.
 
-    # #for nyse
-    df_nyse = pd.read_csv("data/nyse-listed.csv")
-    matches_nyse = []
-    for i in range(len(df_nyse) - 1):
-        current_name = df_nyse.loc[i, 'Company Name']
-        previous_name = df_nyse.loc[i + 1, 'Company Name']
+    Each listing is diffed against its latest snapshot in data_dir/snapshots.
+    Issuer names are normalized only for added or renamed rows, and only the
+    share-class groups of affected issuers are rebuilt. Groups that did not
+    change keep their 'Group ID'. A new snapshot is written only when the
+    listing changed.
 
-        current_first_word = current_name.split()[0]
-        previous_first_word = previous_name.split()[0]
+    Args:
+        data_dir (str): Directory holding the listing and share-class CSVs.
 
-        if current_first_word == previous_first_word:
-            matches_nyse.append(df_nyse.loc[i, ['ACT Symbol', 'Company Name']])
-            matches_nyse.append(df_nyse.loc[i + 1, ['ACT Symbol', 'Company Name']])
+    Returns:
+        dict: Listing file -> changes DataFrame from diff_listings, for listings that changed.
+    """
 
-    matches_df_nyse= pd.DataFrame(matches_nyse)
-    matches_df_nyse.to_csv("data/share_classes_nyse.csv", index=False)
-    print(f"Matches saved to share_classes_nyse.csv.csv")
+    report, resources = {}, []
+    for filename, (output, symbol_column, name_column) in SHARE_CLASS_LISTINGS.items():
+        path = os.path.join(data_dir, filename)
+        if not os.path.exists(path):
+            continue
+        listing = pd.read_csv(path, index_col=0 if filename == 'snp_individual.csv' else None)
+        current = _listing_names(listing, symbol_column, name_column)
+
+        groups_path = os.path.join(data_dir, output)
+        previous = _latest_snapshot(data_dir, filename)
+        groups = pd.read_csv(groups_path) if os.path.exists(groups_path) else None
+        if previous is None or groups is None or 'Issuer' not in groups.columns:
+            # No usable history: diff against an empty listing, so everything counts as added.
+            previous = pd.DataFrame(columns=[symbol_column, name_column, 'Issuer'], dtype=object)
+            groups = pd.DataFrame(columns=[symbol_column, name_column, 'Issuer', 'Group ID'])
+
+        changes = diff_listings(previous, current, symbol_column, name_column)
+        if changes.empty:
+            print(f"{filename}: no changes.")
+            continue
+
+        current = _carry_issuers(previous, current, changes, symbol_column, name_column)
+        groups = update_share_classes(groups, previous, current, changes, symbol_column, name_column)
+        groups.to_csv(groups_path, index=False)
+        _write_snapshot(data_dir, filename, current)
+        resources.append((listing, filename[:-len('.csv')]))
+        report[filename] = changes
+        print(f"{filename}: {changes['Change'].value_counts().to_dict()}, {output} updated.")
+
+    if resources:
+        _update_datapackage(data_dir, resources)
+    return report
+
+
+def diff_listings(previous, current, symbol_column, name_column):
+    """
+    Compare two versions of a listing.
+
+    Args:
+        previous (DataFrame): Older listing.
+        current (DataFrame): Newer listing.
+        symbol_column (str): Column holding the ticker symbol.
+        name_column (str): Column holding the security or company name.
+
+    Returns:
+        DataFrame: One row per change with 'Change' ('added', 'removed', 'renamed'
+        for a new ticker on an unchanged name, or 'name changed'), 'Symbol', 'Name',
+        'Old Symbol' and 'Old Name'.
+    """
 
-    #for s&p individual
-    df = pd.read_csv("data/snp_individual.csv")
-    matches = []
-    for i in range(len(df) - 1):
-        current_name = df.loc[i, 'Security']
-        previous_name = df.loc[i + 1, 'Security']
+    old = previous.drop_duplicates(subset=symbol_column).set_index(symbol_column)[name_column]
+    new = current.drop_duplicates(subset=symbol_column).set_index(symbol_column)[name_column]
+
+    removed = old[~old.index.isin(new.index)]
+    added = new[~new.index.isin(old.index)]
+    common = new.index[new.index.isin(old.index)]
+    changed = common[old[common].to_numpy() != new[common].to_numpy()]
+
+    # A removed and an added symbol with the same name is a ticker change.
+    renamed = pd.merge(pd.DataFrame({'Old Symbol': removed.index, 'Name': removed.to_numpy()}),
+                       pd.DataFrame({'Symbol': added.index, 'Name': added.to_numpy()}), on='Name')
+    renamed = renamed.drop_duplicates(subset='Old Symbol').drop_duplicates(subset='Symbol')
+    renamed['Old Name'] = renamed['Name']
+    removed = removed[~removed.index.isin(renamed['Old Symbol'])]
+    added = added[~added.index.isin(renamed['Symbol'])]
+
+    frames = [
+        pd.DataFrame({'Change': 'added', 'Symbol': added.index, 'Name': added.to_numpy()}),
+        pd.DataFrame({'Change': 'removed', 'Old Symbol': removed.index, 'Old Name': removed.to_numpy()}),
+        renamed.assign(Change='renamed'),
+        pd.DataFrame({'Change': 'name changed', 'Symbol': changed, 'Name': new[changed].to_numpy(),
+                      'Old Symbol': changed, 'Old Name': old[changed].to_numpy()}),
+    ]
+    columns = ['Change', 'Symbol', 'Name', 'Old Symbol', 'Old Name']
+    return pd.concat([frame.reindex(columns=columns) for frame in frames if len(frame)] or
+                     [pd.DataFrame(columns=columns)], ignore_index=True)
+
+
+def update_share_classes(groups, previous, current, changes, symbol_column, name_column):
+    """
+    Rebuild only the share-class groups touched by a listing diff.
+
+    Args:
+        groups (DataFrame): Share classes from group_share_classes for the previous listing.
+        previous (DataFrame): Previous listing snapshot, with an 'Issuer' column.
+        current (DataFrame): Current listing snapshot, with an 'Issuer' column.
+        changes (DataFrame): diff_listings(previous, current, ...).
+        symbol_column (str): Column holding the ticker symbol.
+        name_column (str): Column holding the security or company name.
+
+    Returns:
+        DataFrame: Share classes for the current listing, as group_share_classes
+        returns them. Unaffected groups keep their rows and 'Group ID'; new
+        groups are numbered after the highest existing ID.
+    """
+
+    old_symbols = changes['Old Symbol'].dropna()
+    new_symbols = changes['Symbol'].dropna()
+    affected = pd.concat([
+        previous.loc[previous[symbol_column].isin(old_symbols), 'Issuer'],
+        current.loc[current[symbol_column].isin(new_symbols), 'Issuer'],
+    ]).dropna().unique()
+
+    kept = groups[~groups['Issuer'].isin(affected)]
+    members = current[current['Issuer'].isin(affected)]
+    members = members[members.groupby('Issuer')[symbol_column].transform('size') > 1]
+
+    group_ids = dict(zip(groups['Issuer'], groups['Group ID']))
+    next_id = int(groups['Group ID'].max()) + 1 if len(groups) else 0
+    for issuer in pd.unique(members['Issuer']):
+        if issuer not in group_ids:
+            group_ids[issuer] = next_id
+            next_id += 1
+
+    members = members.assign(**{'Group ID': members['Issuer'].map(group_ids)})
+    columns = [symbol_column, name_column, 'Issuer', 'Group ID']
+    updated = pd.concat([kept[columns], members[columns]], ignore_index=True)
+    return updated.sort_values('Group ID', kind='stable').reset_index(drop=True)
+
+
+def _listing_names(listing, symbol_column, name_column):
+    df = listing[[symbol_column, name_column]].dropna().astype(str)
+    df[symbol_column] = df[symbol_column].str.strip()
+    df[name_column] = df[name_column].str.strip('"').str.strip()
+    return df.drop_duplicates(subset=symbol_column).reset_index(drop=True)
+
+
+def _carry_issuers(previous, current, changes, symbol_column, name_column):
+    """
+    Issuer keys for the current listing, copied from the previous snapshot
+    except for rows the diff says are new or renamed.
+    """
+
+    issuer = current[symbol_column].map(previous.set_index(symbol_column)['Issuer']).astype(object)
+    stale = current[symbol_column].isin(changes['Symbol'].dropna())
+    issuer[stale] = normalize_issuer(current.loc[stale, name_column]).astype(object)
+    return current.assign(Issuer=issuer)
+
+
+def _snapshot_dir(data_dir, filename):
+    return os.path.join(data_dir, 'snapshots', filename[:-len('.csv')])
+
+
+def _latest_snapshot(data_dir, filename):
+    directory = _snapshot_dir(data_dir, filename)
+    versions = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    if not versions:
+        return None
+    # Tickers such as "NA" must not be read as missing values.
+    return pd.read_csv(os.path.join(directory, versions[-1]), dtype=str, keep_default_na=False, na_values=[''])
+
+
+def _write_snapshot(data_dir, filename, snapshot):
+    directory = _snapshot_dir(data_dir, filename)
+    os.makedirs(directory, exist_ok=True)
+    version = pd.Timestamp.now(tz='UTC').strftime('%Y%m%dT%H%M%S%f')
+    snapshot.to_csv(os.path.join(directory, f'{version}.csv'), index=False)
+
+
+def _update_datapackage(data_dir, datasets):
+    """
+    Replace the schema of the given datasets in datapackage.json, keeping the other resources.
+    """
+
+    path = os.path.join(data_dir, 'datapackage.json')
+    package = _create_datapackage([])
+    if os.path.exists(path):
+        with open(path) as infile:
+            package = json.load(infile)
+
+    resources = {resource['name']: resource for resource in package['resources']}
+    for df, filename in datasets:
+        resources[filename] = _create_file_schema(df, filename)
+    package['resources'] = list(resources.values())
+
+    with open(path, 'w') as outfile:
+        json.dump(package, outfile, indent=4, sort_keys=True)
+
+
+# name: (url, output file, parser of the upstream response, write index)
+SOURCES = {
+    'nyse': (NYSE_URL, 'nyse-listed.csv', _parse_nyse, False),
+    'nasdaq': (NASDAQ_URL, 'nasdaq-listed.csv', _parse_nasdaq, False),
+    'snp_individual': (SNP_INDIVIDUAL_URL, 'snp_individual.csv', _parse_snp500_individual, True),
+}
+
+
+def make_session(pool_size=4, retries=MAX_RETRIES, backoff_factor=0.5):
+    """
+    Session with a shared connection pool that retries failed GETs with exponential backoff.
+    """
 
-        current_first_word = current_name.split()[0]
-        previous_first_word = previous_name.split()[0]
+    retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'GET'}))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = f'{PACKAGE_NAME} listings refresh'
+    return session
 
-        if current_first_word == previous_first_word:
-            matches.append(df.loc[i, ['Symbol', 'Security']])
-            matches.append(df.loc[i + 1, ['Symbol', 'Security']])
 
-    matches_df = pd.DataFrame(matches)
-    matches_df.to_csv("data/share_classes_snp_individual.csv", index=False)
-    print(f"Matches saved to share_classes_snp_individual.csv")
+def refresh_listings(sources=None, data_dir='data', include_etfs=True, max_workers=4, timeout=REQUEST_TIMEOUT,
+                     retries=MAX_RETRIES, session=None):
+    """
+    Fetch every listing source concurrently through one pooled session.
+
+    Sources are fetched with If-None-Match / If-Modified-Since from the previous
+    run, so a source the server reports as unchanged (304) is not downloaded or
+    rewritten. Every downloaded response goes through its source's parser,
+    which also accepts a listing already in the output format (e.g. the files of
+    the data directory served by a local test server) after checking its columns.
+
+    Args:
+        sources (dict): Name -> URL for names in SOURCES. Defaults to every source's
+            upstream URL.
+        data_dir (str): Directory the listing CSVs are written to.
+        include_etfs (bool): Also refresh etfs.csv through etfpy, alongside the downloads.
+        max_workers (int): Number of sources fetched at once.
+        timeout (tuple): (connect, read) timeout in seconds for each request.
+        retries (int): Retries per request on connection errors and 429/5xx responses.
+        session (requests.Session): Session to use instead of a new make_session().
+
+    Returns:
+        dict: Name -> {'status': 'updated', 'unchanged' or 'failed', 'seconds': latency
+        including retries, 'bytes': bytes downloaded, 'error': message or None}.
+    """
 
+    urls = {name: source[0] for name, source in SOURCES.items()} if sources is None else dict(sources)
+    unknown = set(urls) - set(SOURCES)
+    if unknown:
+        raise KeyError(f"Unknown listing sources: {sorted(unknown)}.")
+
+    os.makedirs(data_dir, exist_ok=True)
+    validators_path = os.path.join(data_dir, VALIDATORS_FILE)
+    validators = {}
+    if os.path.exists(validators_path):
+        with open(validators_path) as infile:
+            validators = json.load(infile)
+
+    own_session = session is None
+    if own_session:
+        session = make_session(pool_size=max_workers, retries=retries)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {name: pool.submit(_refresh_source, session, name, url, data_dir, validators.get(name, {}),
+                                         timeout)
+                       for name, url in urls.items()}
+            if include_etfs:
+                futures['etfs'] = pool.submit(_refresh_etfs, data_dir)
+            results = {name: future.result() for name, future in futures.items()}
+    finally:
+        if own_session:
+            session.close()
+
+    report = {}
+    for name, (result, source_validators) in results.items():
+        report[name] = result
+        if source_validators is not None:
+            validators[name] = source_validators
+        print(f"{name}: {result['status']} in {result['seconds']:.2f}s" +
+              (f" ({result['error']})" if result['error'] else ''))
+
+    with open(validators_path, 'w') as outfile:
+        json.dump(validators, outfile, indent=4, sort_keys=True)
+
+    return report
+
+
+def _refresh_source(session, name, url, data_dir, validators, timeout):
+    _, filename, parse, write_index = SOURCES[name]
+    path = os.path.join(data_dir, filename)
+
+    headers = {}
+    if os.path.exists(path) and validators.get('url') == url:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    start = time.perf_counter()
+    try:
+        resp = session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304:
+            return {'status': 'unchanged', 'seconds': time.perf_counter() - start, 'bytes': 0, 'error': None}, None
+        resp.raise_for_status()
+
+        # Write next to the target and rename, so readers never see a partial file.
+        parse(resp.text).to_csv(path + '.tmp', index=write_index)
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        return {'status': 'failed', 'seconds': time.perf_counter() - start, 'bytes': 0, 'error': str(e)}, None
+
+    source_validators = {'url': url, 'etag': resp.headers.get('ETag'),
+                         'last_modified': resp.headers.get('Last-Modified')}
+    return ({'status': 'updated', 'seconds': time.perf_counter() - start, 'bytes': len(resp.content), 'error': None},
+            source_validators)
+
+
+def _refresh_etfs(data_dir):
+    start = time.perf_counter()
+    try:
+        df = pd.DataFrame(get_available_etfs_list(), columns=["Symbol"])
+        df.to_csv(os.path.join(data_dir, 'etfs.csv'), index=False)
+    except Exception as e:
+        return {'status': 'failed', 'seconds': time.perf_counter() - start, 'bytes': 0, 'error': str(e)}, None
+    return {'status': 'updated', 'seconds': time.perf_counter() - start, 'bytes': 0, 'error': None}, None
 
 
 if __name__ == '__main__':
-    process_nyse()
-    process_nasdaq()
-    process_snp500_individual()
-    process_etfs()
-    find_share_classes()
+    refresh_listings()
+    update_listings()
@@ -0,0 +1,394 @@
+"""Self-contained event-driven backtester.
+
+Provides the parts of the qstrader interface the strategies in this repo use
+(EventType, BarEvent, SignalEvent, PriceParser, AbstractStrategy), a bar feed
+that replays multi-ticker bars from local files, a batched event queue, and a
+simple fill and portfolio model.
+
+    engine = EventDrivenBacktest(BarFeed.from_csv_dir('prices', ['GLD', 'GDX']))
+    strategy = CointegrationBollingerBandsStrategy(['GLD', 'GDX'], engine.events_queue, 15,
+                                                   [1.0, -1.2], 1.5, 0.5, 1000)
+    stats = engine.run(strategy)
+
+Bars are replayed one timestamp at a time. Every bar event of a timestamp is
+passed to the strategy, then the signals it queued are drained together and
+filled at that timestamp's closing prices.
+
+benchmark() measures the event throughput with the Bollinger bands strategy;
+run it with `python bollinger_bands.py`.
+"""
+
+import contextlib
+import io
+import os
+import time as timer
+from collections import deque
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from bar_store import COLUMNS
+
+EventType = Enum("EventType", "TICK BAR SIGNAL ORDER FILL")
+
+
+class PriceParser:
+    """
+    Prices travel through events as integers scaled by PRICE_MULTIPLIER, as in qstrader.
+    """
+
+    PRICE_MULTIPLIER = 10000000
+
+    @staticmethod
+    def parse(price):
+        return int(round(price * PriceParser.PRICE_MULTIPLIER))
+
+    @staticmethod
+    def display(price, dp=2):
+        return round(price / PriceParser.PRICE_MULTIPLIER, dp)
+
+
+class BarEvent:
+    """
+    One OHLCV bar of one ticker. Prices are PriceParser integers.
+    """
+
+    __slots__ = ('ticker', 'time', 'period', 'open_price', 'high_price', 'low_price', 'close_price',
+                 'volume', 'adj_close_price')
+    type = EventType.BAR
+
+    def __init__(self, ticker, time, period, open_price, high_price, low_price, close_price, volume,
+                 adj_close_price):
+        self.ticker = ticker
+        self.time = time
+        self.period = period
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.close_price = close_price
+        self.volume = volume
+        self.adj_close_price = adj_close_price
+
+    def __repr__(self):
+        return (f"BarEvent({self.ticker}, {self.time}, close={PriceParser.display(self.close_price)}, "
+                f"adj_close={PriceParser.display(self.adj_close_price)})")
+
+
+class SignalEvent:
+    """
+    Request to buy ("BOT") or sell ("SLD") a ticker.
+    """
+
+    __slots__ = ('ticker', 'action', 'suggested_quantity')
+    type = EventType.SIGNAL
+
+    def __init__(self, ticker, action, suggested_quantity=None):
+        self.ticker = ticker
+        self.action = action
+        self.suggested_quantity = suggested_quantity
+
+    def __repr__(self):
+        return f"SignalEvent({self.ticker}, {self.action}, {self.suggested_quantity})"
+
+
+class FillEvent:
+    """
+    An executed trade. price is a float; commission is in cash.
+    """
+
+    __slots__ = ('time', 'ticker', 'action', 'quantity', 'price', 'commission')
+    type = EventType.FILL
+
+    def __init__(self, time, ticker, action, quantity, price, commission):
+        self.time = time
+        self.ticker = ticker
+        self.action = action
+        self.quantity = quantity
+        self.price = price
+        self.commission = commission
+
+    def __repr__(self):
+        return f"FillEvent({self.time}, {self.ticker}, {self.action}, {self.quantity} @ {self.price:.4f})"
+
+
+class AbstractStrategy:
+    """
+    Base class for strategies: calculate_signals receives every event and puts
+    SignalEvents on the events queue it was given.
+    """
+
+    def calculate_signals(self, event):
+        raise NotImplementedError("Should implement calculate_signals()")
+
+
+class EventQueue:
+    """
+    Unlocked FIFO with the put/get/empty interface of queue.Queue, plus drain
+    to take every pending event in one call.
+    """
+
+    __slots__ = ('events',)
+
+    def __init__(self):
+        self.events = deque()
+
+    def put(self, event):
+        self.events.append(event)
+
+    def put_many(self, events):
+        self.events.extend(events)
+
+    def get(self):
+        return self.events.popleft()
+
+    def empty(self):
+        return not self.events
+
+    def __len__(self):
+        return len(self.events)
+
+    def drain(self):
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+
+class BarFeed:
+    """
+    Multi-ticker bars replayed in time order, one batch per timestamp.
+
+    Requires:
+    bars - DataFrame with 'Ticker', 'Date' and Open, High, Low, Close, Volume
+    columns, plus optionally 'Adj Close' (Close is used when it is missing)
+    tickers - Order of tickers within a timestamp. Defaults to order of first appearance
+    period - Bar length in seconds, passed on in each BarEvent
+    """
+
+    def __init__(self, bars, tickers=None, period=86400):
+        tickers = list(pd.unique(bars['Ticker'])) if tickers is None else list(tickers)
+        bars = bars[bars['Ticker'].isin(tickers)]
+        ticker_codes = pd.Categorical(bars['Ticker'], categories=tickers).codes
+        dates = pd.DatetimeIndex(bars['Date'])
+        order = np.lexsort((ticker_codes, dates.asi8))
+
+        self.tickers = tickers
+        self.period = period
+        self.ticker_codes = ticker_codes[order]
+        self.dates = dates[order]
+        self.prices = {}
+        for column in ('Open', 'High', 'Low', 'Close', 'Adj Close'):
+            values = bars[column if column in bars.columns else 'Close'].to_numpy(dtype=float)[order]
+            self.prices[column] = np.round(values * PriceParser.PRICE_MULTIPLIER).astype(np.int64)
+        self.volume = bars['Volume'].to_numpy(dtype=float)[order] if 'Volume' in bars.columns else (
+            np.zeros(len(order)))
+
+    def __len__(self):
+        return len(self.ticker_codes)
+
+    @classmethod
+    def from_frames(cls, frames, period=86400):
+        """
+        Args:
+            frames (dict): Ticker -> DataFrame indexed by date with OHLCV columns.
+        """
+
+        bars = pd.concat([frame.rename_axis('Date').reset_index().assign(Ticker=ticker)
+                          for ticker, frame in frames.items()], ignore_index=True)
+        return cls(bars, tickers=list(frames), period=period)
+
+    @classmethod
+    def from_csv_dir(cls, csv_dir, tickers, period=86400):
+        """
+        Read <csv_dir>/<ticker>.csv for each ticker, e.g. Yahoo Finance daily downloads
+        with Date, Open, High, Low, Close, Adj Close and Volume columns.
+        """
+
+        return cls.from_frames({ticker: pd.read_csv(os.path.join(csv_dir, f"{ticker}.csv"), index_col='Date',
+                                                    parse_dates=True)
+                                for ticker in tickers}, period=period)
+
+    @classmethod
+    def from_store(cls, store, namespace, tickers, start=None, end=None, period=86400):
+        """
+        Read bars from a bar_store.BarStore.
+        """
+
+        return cls.from_frames({ticker: store.read_frame(namespace, ticker, start, end, COLUMNS)
+                                for ticker in tickers}, period=period)
+
+    def batches(self):
+        """
+        Yield (time, list of BarEvents) for each timestamp in order.
+        """
+
+        boundaries = np.flatnonzero(np.diff(self.dates.asi8)) + 1
+        starts = [0] + boundaries.tolist()
+        stops = boundaries.tolist() + [len(self)]
+        times = self.dates[starts].to_pydatetime() if len(self) else []
+
+        tickers = [self.tickers[code] for code in self.ticker_codes.tolist()]
+        opens, highs, lows = (self.prices[column].tolist() for column in ('Open', 'High', 'Low'))
+        closes, adj_closes = self.prices['Close'].tolist(), self.prices['Adj Close'].tolist()
+        volumes = self.volume.tolist()
+        period = self.period
+
+        for time, start, stop in zip(times, starts, stops):
+            yield time, [BarEvent(tickers[i], time, period, opens[i], highs[i], lows[i], closes[i], volumes[i],
+                                  adj_closes[i])
+                         for i in range(start, stop)]
+
+
+class Portfolio:
+    """
+    Cash and positions, marked to the latest close of each ticker.
+
+    Market orders fill at the close of the bar they were signalled on, moved
+    against the trade by slippage_bps, and pay commission_per_share.
+
+    Requires:
+    initial_cash - Starting cash
+    commission_per_share - Commission charged per share traded
+    slippage_bps - Fill price penalty in basis points
+    """
+
+    def __init__(self, initial_cash=100000.0, commission_per_share=0.0, slippage_bps=0.0):
+        self.initial_cash = initial_cash
+        self.commission_per_share = commission_per_share
+        self.slippage_bps = slippage_bps
+        self.cash = float(initial_cash)
+        self.positions = {}
+        self.prices = {}
+        self.fills = []
+        self.equity_times = []
+        self.equity_values = []
+
+    def update_prices(self, bars):
+        prices = self.prices
+        for bar in bars:
+            prices[bar.ticker] = bar.close_price / PriceParser.PRICE_MULTIPLIER
+
+    def execute(self, signal, time):
+        """
+        Fill a SignalEvent at the latest price of its ticker.
+
+        Returns:
+            FillEvent: The fill, or None if the ticker has no price yet or the quantity is 0.
+        """
+
+        price = self.prices.get(signal.ticker)
+        quantity = int(signal.suggested_quantity or 0)
+        if price is None or quantity == 0:
+            return None
+
+        direction = 1 if signal.action == "BOT" else -1
+        fill_price = price * (1 + direction * self.slippage_bps / 10000)
+        commission = abs(quantity) * self.commission_per_share
+        self.cash -= direction * quantity * fill_price + commission
+        position = self.positions.get(signal.ticker, 0) + direction * quantity
+        # Only open positions are kept, so marking a flat book costs nothing.
+        if position:
+            self.positions[signal.ticker] = position
+        else:
+            self.positions.pop(signal.ticker, None)
+
+        fill = FillEvent(time, signal.ticker, signal.action, quantity, fill_price, commission)
+        self.fills.append(fill)
+        return fill
+
+    @property
+    def equity(self):
+        if not self.positions:
+            return self.cash
+        prices = self.prices
+        return self.cash + sum(quantity * prices[ticker] for ticker, quantity in self.positions.items())
+
+    def record(self, time):
+        self.equity_times.append(time)
+        self.equity_values.append(self.equity)
+
+    def equity_curve(self):
+        return pd.Series(self.equity_values, index=pd.DatetimeIndex(self.equity_times), name='Equity')
+
+
+class EventDrivenBacktest:
+    """
+    Replays a BarFeed through a strategy and fills its signals.
+
+    Requires:
+    feed - BarFeed, aligned_feed.AlignedBarFeed or any object with the same batches()
+    initial_cash - Starting cash of the portfolio
+    commission_per_share - Commission charged per share traded
+    slippage_bps - Fill price penalty in basis points
+    """
+
+    def __init__(self, feed, initial_cash=100000.0, commission_per_share=0.0, slippage_bps=0.0):
+        self.feed = feed
+        self.events_queue = EventQueue()
+        self.portfolio = Portfolio(initial_cash, commission_per_share, slippage_bps)
+
+    def run(self, strategy):
+        """
+        Args:
+            strategy (AbstractStrategy): Strategy constructed with this engine's events_queue.
+
+        Returns:
+            dict: 'bar_events', 'signals', 'fills', 'seconds', 'events_per_second'
+            (bar events processed per second) and 'final_equity'.
+        """
+
+        portfolio, events_queue = self.portfolio, self.events_queue
+        calculate_signals = strategy.calculate_signals
+        bar_events = signals = 0
+
+        start = timer.perf_counter()
+        for time, bars in self.feed.batches():
+            portfolio.update_prices(bars)
+            for bar in bars:
+                calculate_signals(bar)
+            bar_events += len(bars)
+
+            if events_queue:
+                for event in events_queue.drain():
+                    if event.type == EventType.SIGNAL:
+                        signals += 1
+                        portfolio.execute(event, time)
+            portfolio.record(time)
+        seconds = timer.perf_counter() - start
+
+        return {
+            'bar_events': bar_events,
+            'signals': signals,
+            'fills': len(portfolio.fills),
+            'seconds': seconds,
+            'events_per_second': bar_events / seconds if seconds > 0 else float('inf'),
+            'final_equity': portfolio.equity,
+        }
+
+
+def benchmark(n_bars=500000, tickers=('A', 'B'), seed=0):
+    """
+    Replay a synthetic cointegrated pair through CointegrationBollingerBandsStrategy
+    and print the event throughput.
+    """
+
+    from bollinger_bands import CointegrationBollingerBandsStrategy
+
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2000-01-01', periods=n_bars, freq='min')
+    common = 100 + np.cumsum(rng.normal(0, 0.1, n_bars))
+    frames = {ticker: pd.DataFrame({column: common + rng.normal(0, 0.5, n_bars) for column in COLUMNS[:4]} |
+                                   {'Volume': 1000.0}, index=dates)
+              for ticker in tickers}
+
+    engine = EventDrivenBacktest(BarFeed.from_frames(frames))
+    weights = [1.0] + [-1.0 / (len(tickers) - 1)] * (len(tickers) - 1)
+    strategy = CointegrationBollingerBandsStrategy(list(tickers), engine.events_queue, 100, weights, 2.0, 0.5, 100)
+    # The strategy prints every trade; keep the timing about the engine.
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = engine.run(strategy)
+
+    print(f"{stats['bar_events']} bar events in {stats['seconds']:.2f}s: "
+          f"{stats['events_per_second']:,.0f} events/s ({stats['events_per_second'] * 60 / 1e6:.1f}M per minute), "
+          f"{stats['fills']} fills")
+    return stats
@@ -1,4 +1,13 @@
-from statsmodels.api import OLS, add_constant
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Windows up to this length are fit exactly, each against its own means; longer
+# ones from running sums over blocks of _BLOCKS_PER_WINDOW windows, centred per
+# block so the sums stay close to the scale of one window.
+_EXACT_WINDOW = 32
+_BLOCKS_PER_WINDOW = 8
+# Window values held at once by the exact path.
+_ROLLING_CHUNK = 1 << 20
 
 
 def calculate_hedging_ratio(series_a, series_b):
@@ -13,7 +22,101 @@ def calculate_hedging_ratio(series_a, series_b):
         float: Hedging ratio (slope of the regression line).
     """
 
-    series_b_with_constant = add_constant(series_b)
-    model = OLS(series_a, series_b_with_constant).fit()
+    slope, _ = ols_hedge_ratios(series_a, series_b)
+
+    return float(slope)
+
+
+def ols_hedge_ratios(series_a, series_b):
+    """
+    Closed-form OLS hedge ratios of series_a on series_b for many pairs at once.
+
+    Args:
+        series_a (ndarray): Dependent prices, shape (bars,) or (bars, pairs).
+        series_b (ndarray): Independent prices, same shape as series_a.
+
+    Returns:
+        tuple: (slopes, intercepts), scalars for 1-D input or arrays of length pairs.
+    """
+
+    a = np.asarray(series_a, dtype=float)
+    b = np.asarray(series_b, dtype=float)
+    if a.shape != b.shape:
+        raise ValueError(f"Series shapes {a.shape} and {b.shape} do not match.")
+
+    mean_a, mean_b = a.mean(axis=0), b.mean(axis=0)
+    db = b - mean_b
+    slopes = (db * (a - mean_a)).sum(axis=0) / (db * db).sum(axis=0)
+
+    return slopes, mean_a - slopes * mean_b
+
+
+def rolling_hedge_ratios(series_a, series_b, window):
+    """
+    Rolling-window OLS hedge ratios of series_a on series_b.
+
+    Windows of up to _EXACT_WINDOW bars are fit with a two-pass regression per
+    window. Longer windows are solved from running sums of b, a, b*b and b*a in
+    O(bars), centred per block of a few windows, which stays within about 1e-11
+    relative error of the two-pass slope.
+
+    Args:
+        series_a (ndarray): Dependent prices, shape (bars,) or (bars, pairs).
+        series_b (ndarray): Independent prices, same shape as series_a.
+        window (int): Number of bars in each regression window.
+
+    Returns:
+        tuple: (slopes, intercepts) with the shape of the inputs. The first
+        window - 1 bars are NaN.
+    """
+
+    a = np.asarray(series_a, dtype=float)
+    b = np.asarray(series_b, dtype=float)
+    if a.shape != b.shape:
+        raise ValueError(f"Series shapes {a.shape} and {b.shape} do not match.")
+    if window < 2:
+        raise ValueError("window must be at least 2.")
+
+    n = len(a)
+    slopes = np.full(a.shape, np.nan)
+    intercepts = np.full(a.shape, np.nan)
+    width = a[0].size if n else 1
+
+    if window <= _EXACT_WINDOW:
+        # Short windows: deviations from each window's own means, taken relative
+        # to the window's last prices so a large price level cancels exactly.
+        rows = max(1, _ROLLING_CHUNK // (window * width))
+        for start in range(window - 1, n, rows):
+            stop = min(start + rows, n)
+            window_a = sliding_window_view(a[start - window + 1:stop], window, axis=0) - a[start:stop, ..., None]
+            window_b = sliding_window_view(b[start - window + 1:stop], window, axis=0) - b[start:stop, ..., None]
+            mean_a, mean_b = window_a.mean(axis=-1), window_b.mean(axis=-1)
+            window_a -= mean_a[..., None]
+            window_b -= mean_b[..., None]
+            slope = (np.einsum('...i,...i->...', window_b, window_a) /
+                     np.einsum('...i,...i->...', window_b, window_b))
+            slopes[start:stop] = slope
+            intercepts[start:stop] = mean_a + a[start:stop] - slope * (mean_b + b[start:stop])
+        return slopes, intercepts
+
+    block = _BLOCKS_PER_WINDOW * window
+    for start in range(window - 1, n, block):
+        stop = min(start + block, n)
+        lo = start - window + 1
+        # The slope does not depend on where the prices are centred, and centring
+        # on the first bar of the block keeps the running sums small.
+        block_a = a[lo:stop] - a[lo]
+        block_b = b[lo:stop] - b[lo]
+        sums = []
+        for values in (block_b, block_a, block_b * block_b, block_b * block_a):
+            running = np.cumsum(values, axis=0)
+            total = running[window - 1:].copy()
+            total[1:] -= running[:-window]
+            sums.append(total)
+        sum_b, sum_a, sum_bb, sum_ba = sums
+
+        slope = (window * sum_ba - sum_b * sum_a) / (window * sum_bb - sum_b * sum_b)
+        slopes[start:stop] = slope
+        intercepts[start:stop] = (sum_a - slope * sum_b) / window + a[lo] - slope * b[lo]
 
-    return model.params[1]
+    return slopes, intercepts
@@ -0,0 +1,235 @@
+"""Content-addressed cache for indicator results.
+
+Results are keyed on a hash of the input arrays plus the indicator name and
+parameters, so the same price history with the same parameters is computed
+once. The cache keeps a bounded in-memory LRU tier and, optionally, an
+on-disk tier of .npy files that are memory-mapped back in by later sessions.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from indicator_pipeline import DEFAULT_PARAMS, INDICATOR_PARAMS, INDICATORS, compute_indicators
+
+_MANIFEST = 'manifest.json'
+
+
+class IndicatorCache:
+    """
+    Two-tier cache of named result arrays.
+
+    Requires:
+    max_entries - Maximum number of results held in memory
+    max_bytes - Optional cap on the total size of results held in memory
+    cache_dir - Optional directory for the on-disk tier
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, cache_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(name, arrays, params=None):
+        """
+        Hash the indicator name, its parameters and the contents of its input arrays.
+        """
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(name.encode())
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(memoryview(array).cast('B'))
+        return digest.hexdigest()
+
+    def get_or_compute(self, name, arrays, params, compute):
+        """
+        Return the cached result for these inputs, computing and storing it on a miss.
+
+        Args:
+            name (str): Indicator name.
+            arrays (list): Input arrays the result depends on.
+            params (dict): Indicator parameters.
+            compute (callable): Called with no arguments on a miss; returns a dict
+                of result name -> array.
+
+        Returns:
+            dict: Result name -> read-only array.
+        """
+
+        key = self.make_key(name, arrays, params)
+        result = self.get(key)
+        if result is None:
+            self.misses += 1
+            result = {column: np.asarray(values) for column, values in compute().items()}
+            self.put(key, result)
+        return result
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        result = self._load(key)
+        if result is not None:
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        for values in result.values():
+            values.flags.writeable = False
+        self._remember(key, result)
+        if self.cache_dir is not None:
+            self._store(key, result)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_held = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, disk hit, miss and eviction counts, and the memory tier's size.
+        """
+
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.bytes_held,
+        }
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.bytes_held += sum(values.nbytes for values in result.values())
+        while len(self.entries) > 1 and (
+            len(self.entries) > self.max_entries or
+            (self.max_bytes is not None and self.bytes_held > self.max_bytes)
+        ):
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes_held -= sum(values.nbytes for values in evicted.values())
+            self.evictions += 1
+
+    def _store(self, key, result):
+        path = os.path.join(self.cache_dir, key)
+        if os.path.isdir(path):
+            return
+
+        # Write into a scratch directory first so readers never see a partial entry.
+        scratch = tempfile.mkdtemp(dir=self.cache_dir)
+        columns = list(result)
+        for i, column in enumerate(columns):
+            np.save(os.path.join(scratch, f"{i}.npy"), result[column])
+        with open(os.path.join(scratch, _MANIFEST), 'w') as outfile:
+            json.dump(columns, outfile)
+        try:
+            os.replace(scratch, path)
+        except OSError:
+            # Another process stored the same entry first.
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            return None
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(path, _MANIFEST)) as infile:
+                columns = json.load(infile)
+        except (OSError, ValueError):
+            return None
+
+        return {column: np.load(os.path.join(path, f"{i}.npy"), mmap_mode='r')
+                for i, column in enumerate(columns)}
+
+
+def cached_indicators(data, outputs, cache=None, **params):
+    """
+    compute_indicators backed by an IndicatorCache.
+
+    Each output is cached on its own, keyed on the price columns it is built
+    from and the parameters its chain of indicators reads, so overriding e.g.
+    atr_period still hits the cached RSI and ADX. Outputs that miss are computed
+    together so they share intermediates.
+
+    Args:
+        data (DataFrame): Data containing 'High', 'Low' and/or 'Close' columns.
+        outputs (list): Indicator names from indicator_pipeline.INDICATORS.
+        cache (IndicatorCache): Cache to use. Computes without caching if None.
+        **params: Overrides for indicator_pipeline.DEFAULT_PARAMS.
+
+    Returns:
+        DataFrame: One column per requested output, indexed like data.
+    """
+
+    if cache is None:
+        return compute_indicators(data, outputs, **params)
+
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise KeyError(f"Unknown indicator parameters: {sorted(unknown)}.")
+    params = {**DEFAULT_PARAMS, **params}
+
+    keys, results, missing = {}, {}, []
+    prices = {}
+    for name in dict.fromkeys(outputs):
+        columns, names = _dependencies(name)
+        for column in columns:
+            if column not in prices:
+                prices[column] = data[column].to_numpy(dtype=float)
+        keys[name] = cache.make_key(name, [prices[column] for column in sorted(columns)],
+                                    {key: params[key] for key in sorted(names)})
+        result = cache.get(keys[name])
+        if result is None:
+            missing.append(name)
+        else:
+            results[name] = result[name]
+
+    if missing:
+        cache.misses += len(missing)
+        computed = compute_indicators(data, missing, **params)
+        for name in missing:
+            result = {name: np.asarray(computed[name].to_numpy())}
+            cache.put(keys[name], result)
+            results[name] = result[name]
+
+    return pd.DataFrame({name: np.array(results[name]) for name in outputs}, index=data.index)
+
+
+def _dependencies(output):
+    """
+    Price columns and DEFAULT_PARAMS keys that output is built from.
+    """
+
+    columns, names, pending, seen = set(), set(), [output], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in INDICATORS:
+            pending.extend(INDICATORS[name][0])
+            names.update(INDICATOR_PARAMS.get(name, ()))
+        else:
+            columns.add(name)
+    return columns, names
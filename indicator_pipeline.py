@@ -0,0 +1,174 @@
+"""Indicator pipeline that shares intermediate results between indicators.
+
+Each indicator declares the columns or intermediates it is built from. Asking
+for several indicators computes every shared intermediate (True Range,
+previous close, directional movement, ...) once. Only the requested outputs
+are returned, in a new DataFrame; the caller's frame is never written to.
+Results match ATR.ATR, ADX.calculate_adx, RSI_signal and MACD.MACD.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PARAMS = {
+    'atr_period': 14,
+    'adx_period': 14,
+    'rsi_period': 14,
+    'short_period': 12,
+    'long_period': 26,
+    'signal_period': 9,
+}
+
+
+def _shift(values):
+    shifted = np.empty_like(values)
+    shifted[0] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def _rolling_mean(values, period, min_periods=None):
+    return pd.Series(values).rolling(window=period, min_periods=min_periods).mean().to_numpy()
+
+
+def _ema(values, span):
+    return pd.Series(values).ewm(span=span, min_periods=1, adjust=False).mean().to_numpy()
+
+
+def _directional_movement(move, opposite):
+    with np.errstate(invalid='ignore'):
+        return np.where(move > opposite, np.maximum(move, 0), 0).astype(float)
+
+
+def _true_range(high_low, high_prev_close, low_prev_close):
+    # Missing previous closes are skipped, as DataFrame.max(axis=1) does in ATR.ATR.
+    return np.fmax(high_low, np.fmax(high_prev_close, low_prev_close))
+
+
+def _rsi(gains, losses, period):
+    avg_gain = _rolling_mean(gains, period, min_periods=1)
+    avg_loss = _rolling_mean(losses, period, min_periods=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * (numerator / denominator)
+
+
+def _dx(di_plus, di_minus):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
+
+
+# name: (inputs, function(*inputs, params)). Inputs are price columns or other indicators.
+INDICATORS = {
+    'Prev Close': (('Close',), lambda close, p: _shift(close)),
+    'Prev High': (('High',), lambda high, p: _shift(high)),
+    'Prev Low': (('Low',), lambda low, p: _shift(low)),
+    'High-Low': (('High', 'Low'), lambda high, low, p: high - low),
+    'High-PrevClose': (('High', 'Prev Close'), lambda high, prev_close, p: abs(high - prev_close)),
+    'Low-PrevClose': (('Low', 'Prev Close'), lambda low, prev_close, p: abs(low - prev_close)),
+    'TR': (('High-Low', 'High-PrevClose', 'Low-PrevClose'),
+           lambda high_low, high_prev_close, low_prev_close, p: _true_range(high_low, high_prev_close,
+                                                                            low_prev_close)),
+    # calculate_adx lets the missing previous close on the first bar propagate.
+    'TR Strict': (('TR', 'Prev Close'), lambda tr, prev_close, p: np.where(np.isnan(prev_close), np.nan, tr)),
+    'ATR': (('TR',), lambda tr, p: _rolling_mean(tr, p['atr_period'])),
+    'Up Move': (('High', 'Prev High'), lambda high, prev_high, p: high - prev_high),
+    'Down Move': (('Low', 'Prev Low'), lambda low, prev_low, p: prev_low - low),
+    'DM+': (('Up Move', 'Down Move'), lambda up, down, p: _directional_movement(up, down)),
+    'DM-': (('Down Move', 'Up Move'), lambda down, up, p: _directional_movement(down, up)),
+    'TR_SMA': (('TR Strict',), lambda tr, p: _rolling_mean(tr, p['adx_period'])),
+    'DI+': (('DM+', 'TR_SMA'), lambda dm, tr_sma, p: _ratio(dm, tr_sma)),
+    'DI-': (('DM-', 'TR_SMA'), lambda dm, tr_sma, p: _ratio(dm, tr_sma)),
+    'DX': (('DI+', 'DI-'), lambda di_plus, di_minus, p: _dx(di_plus, di_minus)),
+    'ADX': (('DX',), lambda dx, p: _rolling_mean(dx, p['adx_period'])),
+    'Delta': (('Close', 'Prev Close'), lambda close, prev_close, p: close - prev_close),
+    'Gains': (('Delta',), lambda delta, p: np.where(delta > 0, delta, 0)),
+    'Losses': (('Delta',), lambda delta, p: np.where(delta < 0, -delta, 0)),
+    'RSI': (('Gains', 'Losses'), lambda gains, losses, p: _rsi(gains, losses, p['rsi_period'])),
+    'EMA_Short': (('Close',), lambda close, p: _ema(close, p['short_period'])),
+    'EMA_Long': (('Close',), lambda close, p: _ema(close, p['long_period'])),
+    'MACD': (('EMA_Short', 'EMA_Long'), lambda short, long, p: short - long),
+    'Signal_Line': (('MACD',), lambda macd, p: _ema(macd, p['signal_period'])),
+    'Histogram': (('MACD', 'Signal_Line'), lambda macd, signal_line, p: macd - signal_line),
+}
+
+# name: DEFAULT_PARAMS keys its function reads. Indicators not listed read none.
+INDICATOR_PARAMS = {
+    'ATR': ('atr_period',),
+    'TR_SMA': ('adx_period',),
+    'ADX': ('adx_period',),
+    'RSI': ('rsi_period',),
+    'EMA_Short': ('short_period',),
+    'EMA_Long': ('long_period',),
+    'Signal_Line': ('signal_period',),
+}
+
+
+def compute_indicators(data, outputs, **params):
+    """
+    Compute the requested indicators, sharing intermediates between them.
+
+    Args:
+        data (DataFrame): Data containing the price columns the outputs need
+            ('High', 'Low' and/or 'Close').
+        outputs (list): Indicator names from INDICATORS, e.g. ['ATR', 'ADX', 'RSI'].
+        **params: Overrides for DEFAULT_PARAMS, e.g. atr_period=20.
+
+    Returns:
+        DataFrame: One column per requested output, indexed like data.
+    """
+
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise KeyError(f"Unknown indicator parameters: {sorted(unknown)}.")
+    params = {**DEFAULT_PARAMS, **params}
+
+    order, consumers = _plan(outputs)
+    values = {}
+    for name in order:
+        if name not in INDICATORS:
+            values[name] = data[name].to_numpy(dtype=float)
+            continue
+
+        inputs, function = INDICATORS[name]
+        values[name] = function(*(values[source] for source in inputs), params)
+        # Drop intermediates as soon as nothing else needs them.
+        for source in inputs:
+            consumers[source] -= 1
+            if consumers[source] == 0 and source not in outputs:
+                del values[source]
+
+    return pd.DataFrame({name: values[name] for name in outputs}, index=data.index)
+
+
+def _plan(outputs):
+    """
+    Order the nodes needed for outputs so every node follows its inputs, and
+    count how many nodes consume each one.
+    """
+
+    order, consumers, visiting = [], {}, set()
+
+    def visit(name):
+        if name in consumers:
+            return
+        if name in visiting:
+            raise ValueError(f"Indicator '{name}' depends on itself.")
+        visiting.add(name)
+        for source in INDICATORS.get(name, ((), None))[0]:
+            visit(source)
+        visiting.discard(name)
+        consumers[name] = 0
+        order.append(name)
+
+    for name in outputs:
+        visit(name)
+    for name in order:
+        for source in INDICATORS.get(name, ((), None))[0]:
+            consumers[source] += 1
+
+    return order, consumers
@@ -1,6 +1,25 @@
 import numpy as np
 
 
+def mean_reverting_signal(data):
+    """
+    Mean-reverting signal kernel: buy below the lower Bollinger Band and sell above
+    the upper one when the combined signal agrees.
+
+    Args:
+        data (DataFrame): Data containing Bollinger Bands and combined signals.
+
+    Returns:
+        ndarray: int8 signal per row (1 buy, -1 sell, 0 flat). data is not modified.
+    """
+
+    combined = data['Combined_Signal'].to_numpy()
+    close = data['Close'].to_numpy()
+    buy = (combined == 1) & (close < data['Lower Band'].to_numpy())
+    sell = (combined == -1) & (close > data['Upper Band'].to_numpy())
+    return buy.astype(np.int8) - (sell & ~buy).astype(np.int8)
+
+
 def mean_reverting_strategy(data):
     """
     Mean-reverting strategy using Bollinger Bands and combined signals.
@@ -11,9 +30,6 @@ def mean_reverting_strategy(data):
     Returns:
         DataFrame: Updated DataFrame with generated signals.
     """
-    data['Signal'] = np.where(
-        (data['Combined_Signal'] == 1) & (data['Close'] < data['Lower Band']), 1,  # Buy
-        np.where((data['Combined_Signal'] == -1) & (data['Close'] > data['Upper Band']), -1, 0)  # Sell
-    )
+    data['Signal'] = mean_reverting_signal(data)
 
     return data
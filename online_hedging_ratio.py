@@ -0,0 +1,144 @@
+import numpy as np
+
+
+class OnlineHedgeRatio:
+    """
+    Recursive hedge ratio and spread for one or many pairs, updated one bar at a time.
+
+    Models Stock A = hedge_ratio * Stock B + intercept with time-varying
+    coefficients. Each update costs O(1) per pair, so a live feed never has to
+    refit over the whole history.
+
+    Requires:
+    n_pairs - Number of pairs updated together
+    method - 'kalman' for a Kalman filter with random-walk coefficients, or
+    'rls' for recursive least squares with exponential forgetting
+    delta - Kalman state noise; higher values let the hedge ratio move faster
+    observation_variance - Kalman measurement noise of Stock A prices
+    forgetting - RLS forgetting factor, between 0 and 1
+    initial_hedge_ratio - Starting hedge ratio (e.g. from an OLS fit)
+    initial_intercept - Starting intercept
+    initial_variance - Prior variance of the starting coefficients
+    """
+
+    _PARAMETERS = ('method', 'delta', 'observation_variance', 'forgetting')
+    _STATE = ('hedge_ratio', 'intercept', 'p_bb', 'p_bc', 'p_cc', 'bars_seen')
+    __slots__ = _PARAMETERS + _STATE
+
+    def __init__(self, n_pairs=1, method='kalman', delta=1e-4, observation_variance=1e-3, forgetting=0.99,
+                 initial_hedge_ratio=0.0, initial_intercept=0.0, initial_variance=1.0):
+        if method not in ('kalman', 'rls'):
+            raise ValueError(f"Unknown method '{method}'.")
+        self.method = method
+        self.delta = delta
+        self.observation_variance = observation_variance
+        self.forgetting = forgetting
+        self.hedge_ratio = np.full(n_pairs, initial_hedge_ratio, dtype=float)
+        self.intercept = np.full(n_pairs, initial_intercept, dtype=float)
+        # Symmetric 2x2 coefficient covariance per pair, stored by element.
+        self.p_bb = np.full(n_pairs, initial_variance, dtype=float)
+        self.p_bc = np.zeros(n_pairs)
+        self.p_cc = np.full(n_pairs, initial_variance, dtype=float)
+        self.bars_seen = np.zeros(n_pairs, dtype=np.int64)
+
+    def update(self, price_a, price_b):
+        """
+        Fold one new bar per pair into the estimate.
+
+        Pairs whose prices are NaN on this bar are left unchanged.
+
+        Args:
+            price_a (float or ndarray): Latest Stock A price of each pair.
+            price_b (float or ndarray): Latest Stock B price of each pair.
+
+        Returns:
+            tuple: (hedge_ratio, intercept, spread, spread_std) arrays, one entry per
+            pair. spread is the one-step forecast error of Stock A and spread_std
+            its standard deviation, so spread / spread_std is a z-score.
+        """
+
+        a = np.broadcast_to(np.asarray(price_a, dtype=float), self.hedge_ratio.shape)
+        b = np.broadcast_to(np.asarray(price_b, dtype=float), self.hedge_ratio.shape)
+        valid = ~(np.isnan(a) | np.isnan(b))
+
+        if self.method == 'kalman':
+            noise = self.delta / (1 - self.delta)
+            p_bb, p_bc, p_cc = self.p_bb + noise, self.p_bc, self.p_cc + noise
+            measurement_variance = self.observation_variance
+        else:
+            p_bb, p_bc, p_cc = self.p_bb / self.forgetting, self.p_bc / self.forgetting, self.p_cc / self.forgetting
+            measurement_variance = 1.0
+
+        spread = a - (self.hedge_ratio * b + self.intercept)
+        # P x for the observation vector x = [b, 1].
+        px_b = p_bb * b + p_bc
+        px_c = p_bc * b + p_cc
+        variance = b * px_b + px_c + measurement_variance
+        gain_b, gain_c = px_b / variance, px_c / variance
+
+        self.hedge_ratio = np.where(valid, self.hedge_ratio + gain_b * spread, self.hedge_ratio)
+        self.intercept = np.where(valid, self.intercept + gain_c * spread, self.intercept)
+        self.p_bb = np.where(valid, p_bb - gain_b * px_b, self.p_bb)
+        self.p_bc = np.where(valid, p_bc - gain_b * px_c, self.p_bc)
+        self.p_cc = np.where(valid, p_cc - gain_c * px_c, self.p_cc)
+        self.bars_seen += valid
+
+        return self.hedge_ratio, self.intercept, spread, np.sqrt(variance)
+
+    def run(self, series_a, series_b):
+        """
+        Feed a history of bars through update, e.g. to warm up before going live.
+
+        Args:
+            series_a (ndarray): Stock A prices, shape (bars,) or (bars, pairs).
+            series_b (ndarray): Stock B prices, same shape as series_a.
+
+        Returns:
+            tuple: (hedge_ratio, intercept, spread, spread_std) arrays of shape (bars, pairs).
+        """
+
+        a = np.asarray(series_a, dtype=float).reshape(len(series_a), -1)
+        b = np.asarray(series_b, dtype=float).reshape(len(series_b), -1)
+        outputs = np.empty((4,) + a.shape)
+        for t in range(len(a)):
+            outputs[:, t] = self.update(a[t], b[t])
+
+        return tuple(outputs)
+
+    def snapshot(self):
+        """
+        Return the estimator parameters and state as a dict of scalars and arrays.
+        """
+
+        state = {name: getattr(self, name) for name in self._PARAMETERS}
+        state.update({name: np.copy(getattr(self, name)) for name in self._STATE})
+        return state
+
+    @classmethod
+    def restore(cls, state):
+        """
+        Rebuild an estimator from a snapshot without replaying history.
+        """
+
+        estimator = cls(len(state['hedge_ratio']), method=str(state['method']), delta=float(state['delta']),
+                        observation_variance=float(state['observation_variance']),
+                        forgetting=float(state['forgetting']))
+        for name in cls._STATE:
+            setattr(estimator, name, np.array(state[name], dtype=getattr(estimator, name).dtype))
+        return estimator
+
+    def save(self, path):
+        """
+        Write a snapshot to an .npz file.
+        """
+
+        np.savez(path, **self.snapshot())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Rebuild an estimator from an .npz file written by save.
+        """
+
+        with np.load(path) as state:
+            return cls.restore(state)
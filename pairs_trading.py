@@ -1,24 +1,93 @@
-from mean_reverting import mean_reverting_strategy
-from trend_following import trend_following_strategy
+import numpy as np
 
+from mean_reverting import mean_reverting_signal
+from trend_following import trend_following_signal
 
-def pairs_trading_strategy(data):
+# Regime ID -> signal kernel. A kernel takes the whole DataFrame and returns one
+# signal per row without modifying it. Regimes without a kernel stay flat.
+REGIME_STRATEGIES = {
+    0: mean_reverting_signal,  # Mean-reverting regime
+    1: trend_following_signal,  # Trend-following regime
+}
+
+
+def register_regime_strategy(regime, kernel, strategies=REGIME_STRATEGIES):
+    """
+    Use kernel for the signals of rows in regime.
+
+    Args:
+        regime (int): Non-negative regime ID, as in the 'Regime' column.
+        kernel (callable): Function of the DataFrame returning a signal array.
+        strategies (dict): Registry to add to. Defaults to REGIME_STRATEGIES.
+    """
+
+    if int(regime) != regime or regime < 0:
+        raise ValueError(f"Regime IDs must be non-negative integers, got {regime}.")
+    strategies[int(regime)] = kernel
+
+
+def regime_signals(data, strategies=None, regime_column='Regime'):
+    """
+    Dispatch each row to the signal kernel of its regime.
+
+    Every kernel in use runs once over the full columns, and each row then takes
+    its signal from its regime's kernel in a single gather, so no per-regime
+    copies of data are made. A kernel registered for several regimes runs once.
+
+    Args:
+        data (DataFrame): Data containing regime labels and the kernels' inputs.
+        strategies (dict): Regime ID -> kernel. Defaults to REGIME_STRATEGIES.
+        regime_column (str): Column holding the regime IDs.
+
+    Returns:
+        ndarray: int8 signal per row, 0 where the regime is missing, not a
+        non-negative integer, or has no kernel.
+    """
+
+    if strategies is None:
+        strategies = REGIME_STRATEGIES
+    regimes = data[regime_column].to_numpy(dtype=float)
+    # Negative and non-integer IDs are not regimes, and IDs above the largest
+    # registered one have no kernel; all of them read the zero row like missing ones.
+    size = int(max(strategies, default=-1)) + 1
+    with np.errstate(invalid='ignore'):
+        known = np.isfinite(regimes) & (regimes >= 0) & (regimes < size) & (regimes == np.floor(regimes))
+    present = set(np.unique(regimes[known]).astype(int).tolist())
+
+    # One signal row per distinct kernel, plus a final row of zeros.
+    kernels = []
+    used = {}
+    for regime, kernel in strategies.items():
+        if regime in present:
+            if kernel not in kernels:
+                kernels.append(kernel)
+            used[int(regime)] = kernels.index(kernel)
+
+    signals = np.zeros((len(kernels) + 1, len(data)), dtype=np.int8)
+    for i, kernel in enumerate(kernels):
+        signals[i] = kernel(data)
+
+    # Regime ID -> signal row. Unregistered regimes read the zero row.
+    table = np.full(size, len(kernels), dtype=np.intp)
+    for regime, i in used.items():
+        table[regime] = i
+    rows = np.full(len(data), len(kernels), dtype=np.intp)
+    rows[known] = table[regimes[known].astype(np.intp)]
+    return signals[rows, np.arange(len(data))]
+
+
+def pairs_trading_strategy(data, strategies=None):
     """
     Apply trading strategies based on detected market regimes.
 
     Args:
         data (DataFrame): Data containing regime labels and price data.
+        strategies (dict): Regime ID -> signal kernel. Defaults to REGIME_STRATEGIES.
 
     Returns:
         DataFrame: Updated DataFrame with trading signals.
     """
 
-    for regime in data['Regime'].unique():
-        regime_data = data[data['Regime'] == regime]
-
-        if regime == 0:  # Mean-reverting regime
-            data.loc[regime_data.index] = mean_reverting_strategy(regime_data)
-        elif regime == 1:  # Trend-following regime
-            data.loc[regime_data.index] = trend_following_strategy(regime_data)
+    data['Signal'] = regime_signals(data, strategies)
 
     return data
@@ -0,0 +1,234 @@
+"""Parameter sweeps for the pairs strategy.
+
+The indicators and the spread of each pair are computed once by prepare_pair.
+Parameter sets are then evaluated in chunks: every set in a chunk is one
+column of a (bars x sets) matrix, so the rolling z-score, position and equity
+of the whole chunk come out of a few array operations. Chunks run across a
+pool of worker processes, which receive the pair arrays once, and chunk_size
+bounds the memory of each one.
+
+Each parameter set is (rsi_weight, adx_weight, lookback, entry_z, exit_z):
+
+- lookback, entry_z and exit_z drive the spread position through
+  spread.rolling_zscore and spread.zscore_signals. The z-score uses the sample
+  standard deviation, so it differs slightly from the population one of
+  bollinger_bands.CointegrationBollingerBandsStrategy;
+- rsi_weight and adx_weight build the Combined_Signal as in
+  preprocessing.preprocess_pairs, and the position is flattened on bars where
+  the combined signal points the other way.
+
+    pairs = {'GOOG/GOOGL': prepare_pair(prices, 'GOOG', 'GOOGL', hedge_ratio)}
+    results = sweep_parameters(pairs, method='halving', n_samples=500)
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from indicator_cache import cached_indicators
+from spread import rolling_zscore, zscore_signals
+
+PARAMETERS = ['RSI Weight', 'ADX Weight', 'Lookback', 'Entry Z', 'Exit Z']
+RESULT_COLUMNS = ['Pair', *PARAMETERS, 'Bars', 'Total Return', 'Sharpe Ratio', 'Max Drawdown', 'Trades']
+
+DEFAULT_GRID = {
+    'rsi_weight': [0.0, 0.25, 0.5, 0.75, 1.0],
+    'adx_weight': [0.0, 0.25, 0.5, 0.75, 1.0],
+    'lookback': [10, 15, 20, 30, 45, 60],
+    'entry_z': [1.0, 1.5, 2.0, 2.5],
+    'exit_z': [0.0, 0.25, 0.5, 1.0],
+}
+SEARCH_METHODS = ('grid', 'random', 'halving')
+
+
+def prepare_pair(data, stock_a_col, stock_b_col, hedging_ratio, cache=None):
+    """
+    Compute the inputs of a sweep for one pair: its spread and the RSI and ADX signals.
+
+    Args:
+        data (DataFrame): Data containing the two price columns and the 'High', 'Low'
+            and 'Close' columns the indicators are built from.
+        stock_a_col (str): Column name for Stock A prices.
+        stock_b_col (str): Column name for Stock B prices.
+        hedging_ratio (float): Hedging ratio between Stock A and Stock B.
+        cache (IndicatorCache): Optional cache so repeated sweeps skip the indicators.
+
+    Returns:
+        dict: 'spread', 'rsi_signal' and 'adx_signal' arrays.
+    """
+
+    if stock_a_col not in data.columns or stock_b_col not in data.columns:
+        raise KeyError(f"Columns '{stock_a_col}' and/or '{stock_b_col}' not found.")
+
+    indicators = cached_indicators(data, ['RSI', 'ADX'], cache)
+    rsi = indicators['RSI'].to_numpy(dtype=float)
+    adx = indicators['ADX'].to_numpy(dtype=float)
+    return {
+        'spread': data[stock_a_col].to_numpy(dtype=float) - hedging_ratio * data[stock_b_col].to_numpy(dtype=float),
+        'rsi_signal': np.where(rsi < 30, 1, np.where(rsi > 70, -1, 0)).astype(np.int8),
+        'adx_signal': np.where(adx > 25, 1, 0).astype(np.int8),
+    }
+
+
+def parameter_grid(rsi_weight=None, adx_weight=None, lookback=None, entry_z=None, exit_z=None):
+    """
+    Every combination of the given values (DEFAULT_GRID where None), without the
+    combinations where exit_z is not below entry_z.
+
+    Returns:
+        ndarray: One row per parameter set, columns in PARAMETERS order.
+    """
+
+    values = [DEFAULT_GRID[name] if given is None else given
+              for name, given in zip(DEFAULT_GRID, (rsi_weight, adx_weight, lookback, entry_z, exit_z))]
+    grid = np.array(list(product(*values)), dtype=float).reshape(-1, len(PARAMETERS))
+    return grid[(grid[:, 4] >= 0) & (grid[:, 4] < grid[:, 3])]
+
+
+def sweep_parameters(pairs, grid=None, method='grid', n_samples=100, eta=3, min_bars=250, initial_cash=100000,
+                     base_quantity=100, periods_per_year=252, max_workers=None, chunk_size=256, seed=0):
+    """
+    Evaluate parameter sets on every pair and rank them.
+
+    Args:
+        pairs (dict): Pair name -> prepare_pair output.
+        grid (ndarray): Parameter sets, one row each in PARAMETERS order. Defaults to parameter_grid().
+        method (str): 'grid' to evaluate every set, 'random' for n_samples sets drawn
+            from the grid, or 'halving' for successive halving: n_samples sets are
+            evaluated on a prefix of at least min_bars bars, the best 1/eta by Sharpe ratio are
+            kept and evaluated on eta times as many bars, and so on up to every bar.
+        n_samples (int): Sets drawn for 'random' and 'halving'.
+        eta (int): Reduction factor between successive-halving rounds.
+        min_bars (int): Fewest bars in the first successive-halving round.
+        initial_cash (float): Starting equity of every run.
+        base_quantity (float): Units of the spread traded per position.
+        periods_per_year (int): Bars per year, to annualize the Sharpe ratio.
+        max_workers (int): Worker processes. Defaults to the CPU count; 1 runs in-process.
+        chunk_size (int): Parameter sets evaluated together, which bounds the
+            scratch arrays of a worker to a few (bars x chunk_size) matrices.
+        seed (int): Seed for drawing the sets of 'random' and 'halving'.
+
+    Returns:
+        DataFrame: One row per evaluated set and pair with 'Total Return',
+        'Sharpe Ratio', 'Max Drawdown' and 'Trades', best Sharpe ratio first.
+        For 'halving', 'Bars' shows the round each row comes from.
+    """
+
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"Unknown search method '{method}'. Expected one of {SEARCH_METHODS}.")
+    grid = parameter_grid() if grid is None else np.asarray(grid, dtype=float).reshape(-1, len(PARAMETERS))
+    if method != 'grid' and n_samples < len(grid):
+        grid = grid[np.random.default_rng(seed).choice(len(grid), n_samples, replace=False)]
+    settings = (initial_cash, base_quantity, periods_per_year)
+
+    # Workers receive the pair arrays once, and each task only the pair name and bar count.
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        executor = None
+        _set_pairs(pairs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_set_pairs, initargs=(pairs,))
+    try:
+        rounds = []
+        for name, arrays in pairs.items():
+            candidates = grid
+            n_bars = len(arrays['spread'])
+            bars = n_bars
+            if method == 'halving':
+                n_rounds = max(1, math.ceil(math.log(max(len(candidates), 1), eta)) + 1)
+                bars = min(n_bars, max(min_bars, math.ceil(n_bars / eta ** (n_rounds - 1))))
+            while True:
+                metrics = _evaluate(executor, name, candidates, bars, settings, chunk_size)
+                rounds.append(_results(name, candidates, bars, metrics))
+                if method != 'halving' or bars >= n_bars or len(candidates) <= 1:
+                    break
+                keep = np.argsort(-np.nan_to_num(metrics[:, 1], nan=-np.inf), kind='stable')
+                candidates = candidates[keep[:max(1, math.ceil(len(candidates) / eta))]]
+                bars = min(n_bars, bars * eta)
+    finally:
+        if executor is None:
+            _set_pairs(None)
+        else:
+            executor.shutdown()
+
+    results = pd.concat(rounds, ignore_index=True) if rounds else pd.DataFrame(columns=RESULT_COLUMNS)
+    return results.sort_values(['Bars', 'Sharpe Ratio'], ascending=False, ignore_index=True)
+
+
+def evaluate_parameters(arrays, params, initial_cash=100000, base_quantity=100, periods_per_year=252):
+    """
+    Backtest a batch of parameter sets on one pair in a single vectorized pass.
+
+    Args:
+        arrays (dict): prepare_pair output.
+        params (ndarray): Parameter sets, one row each in PARAMETERS order.
+
+    Returns:
+        ndarray: One row per set of (total return, Sharpe ratio, max drawdown, trades).
+    """
+
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    spread = np.asarray(arrays['spread'], dtype=float)
+
+    # Z-scores of each distinct lookback, gathered into one column per set.
+    lookbacks, columns = np.unique(params[:, 2].astype(int), return_inverse=True)
+    zscores = np.column_stack([rolling_zscore(spread, lookback) for lookback in lookbacks])
+    position = zscore_signals(zscores[:, columns], params[:, 3], params[:, 4])
+
+    combined = np.round(params[:, 0] * arrays['rsi_signal'][:, None] + params[:, 1] * arrays['adx_signal'][:, None])
+    position[np.sign(combined) == -position] = 0
+
+    # The position held at the close of a bar earns the next bar's spread change.
+    pnl = np.zeros(position.shape)
+    pnl[1:] = base_quantity * position[:-1] * np.nan_to_num(np.diff(spread))[:, None]
+    equity = initial_cash + np.cumsum(pnl, axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = equity[1:] / equity[:-1] - 1
+        std = returns.std(axis=0, ddof=1)
+        sharpe = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(periods_per_year), np.nan)
+        drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+    trades = np.count_nonzero(np.diff(position, axis=0, prepend=0), axis=0)
+
+    return np.column_stack([equity[-1] / initial_cash - 1, sharpe, drawdown, trades])
+
+
+def _evaluate(executor, name, candidates, bars, settings, chunk_size):
+    # Sort by lookback so a chunk needs few distinct rolling z-scores.
+    order = np.argsort(candidates[:, 2], kind='stable')
+    tasks = [(name, bars, candidates[order[lo:lo + chunk_size]], settings)
+             for lo in range(0, len(candidates), chunk_size)]
+    chunks = map(_evaluate_chunk, tasks) if executor is None else executor.map(_evaluate_chunk, tasks)
+
+    metrics = np.empty((len(candidates), 4))
+    for lo, chunk in zip(range(0, len(candidates), chunk_size), chunks):
+        metrics[order[lo:lo + chunk_size]] = chunk
+    return metrics
+
+
+_pairs = None
+
+
+def _set_pairs(pairs):
+    global _pairs
+    _pairs = pairs
+
+
+def _evaluate_chunk(task):
+    name, bars, params, settings = task
+    prefix = {key: values[:bars] for key, values in _pairs[name].items()}
+    return evaluate_parameters(prefix, params, *settings)
+
+
+def _results(name, candidates, bars, metrics):
+    results = pd.DataFrame(candidates, columns=PARAMETERS)
+    results['Lookback'] = results['Lookback'].astype(int)
+    results.insert(0, 'Pair', name)
+    results['Bars'] = bars
+    results[['Total Return', 'Sharpe Ratio', 'Max Drawdown']] = metrics[:, :3]
+    results['Trades'] = metrics[:, 3].astype(int)
+    return results
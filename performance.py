@@ -0,0 +1,272 @@
+"""Performance analytics for many equity curves at once.
+
+Every metric is computed over a (bars x strategies) equity matrix with array
+operations along the bar axis, so summarizing a whole parameter sweep costs a
+few passes over the matrix. The rolling versions keep running sums (and a
+block-wise running maximum for drawdowns), so they take O(bars) time whatever
+the window length.
+
+    summary = performance_summary(equity, positions, periods_per_year=252)
+    rolling = rolling_performance(equity, window=63)
+    rolling['Sharpe Ratio']              # (bars x strategies)
+"""
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ['Total Return', 'Annual Return', 'Annual Volatility', 'Sharpe Ratio', 'Sortino Ratio',
+                   'Max Drawdown', 'Max Drawdown Duration', 'Turnover', 'Hit Rate']
+ROLLING_METRICS = ('Sharpe Ratio', 'Sortino Ratio', 'Drawdown', 'Turnover', 'Hit Rate')
+# From this many strategies on, running maxima step through the bars rather than
+# accumulating down each column.
+_ROW_STEP_COLUMNS = 64
+
+
+def performance_summary(equity, positions=None, periods_per_year=252, risk_free_rate=0.0):
+    """
+    Summary statistics of every equity curve in one vectorized pass.
+
+    Args:
+        equity (DataFrame or ndarray): Equity, one row per bar and one column per
+            strategy (a 1-D array is one strategy).
+        positions (DataFrame or ndarray): Optional positions with the shape of
+            equity, as portfolio weights or units, for the turnover.
+        periods_per_year (int): Bars per year, to annualize.
+        risk_free_rate (float): Annual risk-free rate.
+
+    Returns:
+        DataFrame: One row per strategy with the SUMMARY_COLUMNS:
+        annualized return, volatility, Sharpe and Sortino ratios (NaN where returns
+        do not vary), max drawdown as a negative fraction, the longest stretch in
+        bars spent below a previous peak, turnover as the mean absolute position
+        change per bar times periods_per_year (NaN without positions), and hit
+        rate as the share of bars with a non-zero return that gained.
+    """
+
+    values, index = _as_matrix(equity)
+    returns = _returns(values)
+    missing = np.isnan(returns)
+    count = len(returns) - np.count_nonzero(missing, axis=0)
+    wins = np.count_nonzero(returns > 0, axis=0)
+    active = wins + np.count_nonzero(returns < 0, axis=0)
+
+    # Missing returns count as zero in the sums. Scratch matrices the size of
+    # the equity are reused in place.
+    excess = np.subtract(returns, risk_free_rate / periods_per_year, out=returns)
+    excess[missing] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = excess.sum(axis=0) / count
+        deviations = excess - mean
+        deviations[missing] = 0.0
+        std = np.where(count > 1, np.sqrt(np.einsum('ij,ij->j', deviations, deviations) / (count - 1)), np.nan)
+        losses = np.minimum(excess, 0.0, out=deviations)
+        downside = np.sqrt(np.einsum('ij,ij->j', losses, losses) / count)
+        root_periods = np.sqrt(periods_per_year)
+        sharpe = np.where(std > 0, mean / std * root_periods, np.nan)
+        sortino = np.where(downside > 0, mean / downside * root_periods, np.nan)
+        hit_rate = np.where(active > 0, wins / active, np.nan)
+
+        total_return = values[-1] / values[0] - 1 if len(values) else np.full(values.shape[1], np.nan)
+        annual_return = (1 + total_return) ** (periods_per_year / np.maximum(len(values) - 1, 1)) - 1
+
+    drawdown, duration = _drawdowns(values)
+    if positions is None:
+        turnover = np.full(values.shape[1], np.nan)
+    else:
+        position_values, _ = _as_matrix(positions)
+        if position_values.shape != values.shape:
+            raise ValueError(f"positions has shape {position_values.shape}, expected {values.shape}.")
+        if len(position_values) > 1:
+            changes = np.diff(position_values, axis=0)
+            turnover = np.abs(changes, out=changes).mean(axis=0) * periods_per_year
+        else:
+            turnover = np.full(values.shape[1], np.nan)
+
+    summary = np.column_stack([total_return, annual_return, std * root_periods, sharpe, sortino,
+                               drawdown, duration, turnover, hit_rate])
+    result = pd.DataFrame(summary, index=index, columns=SUMMARY_COLUMNS)
+    result['Max Drawdown Duration'] = result['Max Drawdown Duration'].astype(np.int64)
+    return result
+
+
+def rolling_performance(equity, window, positions=None, periods_per_year=252, risk_free_rate=0.0):
+    """
+    Trailing-window versions of the summary metrics, in O(bars) per strategy.
+
+    Args:
+        equity (DataFrame or ndarray): Equity, one row per bar and one column per strategy.
+        window (int): Bars per window.
+        positions (DataFrame or ndarray): Optional positions with the shape of equity.
+        periods_per_year (int): Bars per year, to annualize.
+        risk_free_rate (float): Annual risk-free rate.
+
+    Returns:
+        dict: ROLLING_METRICS name -> (bars x strategies) array (DataFrames when
+        equity is one). Each row covers the window returns ending at that bar and is
+        NaN until the window is full. 'Drawdown' is the drop from the highest equity
+        in the window.
+    """
+
+    if window < 2:
+        raise ValueError(f"window must be at least 2, got {window}.")
+    values, columns = _as_matrix(equity)
+    n_bars, n_strategies = values.shape
+    returns = np.full(values.shape, np.nan)
+    returns[1:] = _returns(values)
+    excess = returns - risk_free_rate / periods_per_year
+    valid = ~np.isnan(returns)
+
+    # Centre the returns on each column's mean so the running sums stay small;
+    # Sharpe, Sortino and hit rate only use them through window differences.
+    centre = np.nanmean(excess, axis=0) if n_bars > 1 else np.zeros(n_strategies)
+    centred = np.where(valid, excess - centre, 0.0)
+    if valid[1:].all():
+        # No gaps: the count only depends on the row.
+        count = np.minimum(np.arange(n_bars), window).astype(float)[:, None]
+    else:
+        count = _window_sum(valid.astype(float), window)
+    total = _window_sum(centred, window)
+    total_sq = _window_sum(centred * centred, window)
+    downside_sq = _window_sum(np.where(valid, np.minimum(excess, 0), 0.0) ** 2, window)
+    wins = _window_sum((returns > 0).astype(float), window)
+    active = _window_sum((valid & (returns != 0)).astype(float), window)
+
+    full = count == window
+    root_periods = np.sqrt(periods_per_year)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq - total * mean, 0.0) / (count - 1))
+        mean += centre
+        downside = np.sqrt(downside_sq / count)
+        metrics = {
+            'Sharpe Ratio': np.where(full & (std > 0), mean / std * root_periods, np.nan),
+            'Sortino Ratio': np.where(full & (downside > 0), mean / downside * root_periods, np.nan),
+            'Drawdown': np.where(full, values / _rolling_max(values, window) - 1, np.nan),
+            'Hit Rate': np.where(full & (active > 0), wins / active, np.nan),
+        }
+
+    if positions is None:
+        metrics['Turnover'] = np.full(values.shape, np.nan)
+    else:
+        position_values, _ = _as_matrix(positions)
+        changes = np.zeros(values.shape)
+        changes[1:] = np.abs(np.diff(position_values, axis=0))
+        metrics['Turnover'] = np.where(full, _window_sum(changes, window) / window * periods_per_year, np.nan)
+
+    metrics = {name: metrics[name] for name in ROLLING_METRICS}
+    if isinstance(equity, pd.DataFrame):
+        metrics = {name: pd.DataFrame(values, index=equity.index, columns=columns)
+                   for name, values in metrics.items()}
+    return metrics
+
+
+def _as_matrix(values):
+    if isinstance(values, pd.Series):
+        values = values.to_frame()
+    if isinstance(values, pd.DataFrame):
+        return values.to_numpy(dtype=float), values.columns
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    if values.ndim != 2:
+        raise ValueError("equity must be a (bars x strategies) matrix.")
+    return values, pd.RangeIndex(values.shape[1])
+
+
+def _returns(values):
+    # Returns from a zero or missing equity are undefined and left out as NaN.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = values[1:] / values[:-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+
+def _drawdowns(values):
+    """
+    Max drawdown (negative fraction) and the longest run of bars below a previous peak, per column.
+
+    A few strategies are accumulated down their columns in one pass. Wide matrices
+    step through the bars with every strategy in one row operation instead, as
+    accumulating down the columns of a wide row-major matrix is much slower.
+    """
+
+    n_bars, n_strategies = values.shape
+    if not n_bars:
+        return np.full(n_strategies, np.nan), np.zeros(n_strategies)
+
+    if n_strategies < _ROW_STEP_COLUMNS:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = values / np.fmax.accumulate(values, axis=0)
+        bars = np.arange(n_bars)[:, None]
+        last_peak = np.maximum.accumulate(np.where(ratio >= 1, bars, 0), axis=0)
+        return np.fmin.reduce(ratio, axis=0, initial=1.0) - 1, (bars - last_peak).max(axis=0)
+
+    peak = values[0].copy()
+    ratio = np.empty(n_strategies)
+    worst = np.ones(n_strategies)
+    last_peak = np.zeros(n_strategies, dtype=np.int64)
+    longest = np.zeros(n_strategies, dtype=np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i, row in enumerate(values):
+            np.fmax(peak, row, out=peak)
+            np.divide(row, peak, out=ratio)
+            np.fmin(worst, ratio, out=worst)
+            np.putmask(last_peak, ratio >= 1, i)
+            np.maximum(longest, i - last_peak, out=longest)
+    return worst - 1, longest
+
+
+def _window_sum(values, window):
+    """
+    Trailing sum over window rows, from one running sum (first window - 1 rows are partial).
+    """
+
+    running = _accumulate(np.add, values)
+    result = np.empty_like(running)
+    result[:window] = running[:window]
+    np.subtract(running[window:], running[:-window], out=result[window:])
+    return result
+
+
+def _rolling_max(values, window):
+    """
+    Trailing maximum over window rows in O(rows): within fixed blocks of window
+    rows, a window ending at row t is the suffix of one block plus the prefix of
+    the next, so two running maxima per block cover every window (van Herk/Gil-Werman).
+    """
+
+    n_bars, n_columns = values.shape
+    n_blocks = -(-n_bars // window)
+    padded = np.full((n_blocks * window, n_columns), -np.inf)
+    padded[:n_bars] = values
+    padded[np.isnan(padded)] = -np.inf
+    prefix = _accumulate(np.maximum, padded, window)
+    suffix = _accumulate(np.maximum, padded[::-1], window)[::-1]
+
+    result = np.full(values.shape, np.nan)
+    if n_bars >= window:
+        np.maximum(suffix[:n_bars - window + 1], prefix[window - 1:n_bars], out=result[window - 1:])
+    return result
+
+
+def _accumulate(ufunc, values, block=None):
+    """
+    ufunc.accumulate down the rows, restarting every block rows (the row count
+    must then be a multiple of block).
+
+    A few columns are accumulated down each column. Wide matrices step through
+    the rows with every column in one operation, which is much faster on
+    row-major data and applies the ufunc in the same order.
+    """
+
+    n_rows, n_columns = values.shape
+    if n_columns < _ROW_STEP_COLUMNS:
+        if block is None:
+            return ufunc.accumulate(values, axis=0)
+        return ufunc.accumulate(values.reshape(-1, block, n_columns), axis=1).reshape(n_rows, n_columns)
+
+    result = np.array(values)
+    for i in range(1, n_rows):
+        if block is None or i % block:
+            ufunc(result[i - 1], result[i], out=result[i])
+    return result
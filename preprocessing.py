@@ -1,12 +1,10 @@
 import numpy as np
 from cointegrated_pairs_strategy.spread import calculate_spread_and_signals
 from cointegrated_pairs_strategy.cointegration import test_cointegration
-from Signals.RSI Signals import RSI_signal
-from Signals.ADX import calculate_adx
-from Signals.ATR import ATR
+from indicator_cache import cached_indicators
 
 
-def preprocess_pairs(data, stock_a_col, stock_b_col, rsi_weight=0.5, adx_weight=0.5):
+def preprocess_pairs(data, stock_a_col, stock_b_col, rsi_weight=0.5, adx_weight=0.5, cache=None):
     """
     Preprocess data for pairs trading, including cointegration testing, spread calculation,
     and signal generation using weighted RSI and ADX.
@@ -17,6 +15,7 @@ def preprocess_pairs(data, stock_a_col, stock_b_col, rsi_weight=0.5, adx_weight=
         stock_b_col (str): Column name for Stock B prices.
         rsi_weight (float): Weight assigned to RSI signals (0 to 1).
         adx_weight (float): Weight assigned to ADX signals (0 to 1).
+        cache (IndicatorCache): Optional cache so repeated runs on the same prices skip the indicators.
 
     Returns:
         DataFrame: Updated DataFrame with spread, combined signals, and risk levels.
@@ -32,11 +31,12 @@ def preprocess_pairs(data, stock_a_col, stock_b_col, rsi_weight=0.5, adx_weight=
         raise ValueError(f"Pairs {stock_a_col} and {stock_b_col} not cointegrated (p-value={p_value:.4f}).")
 
     data = calculate_spread_and_signals(data, stock_a_col, stock_b_col)
-    data['ATR'] = ATR(data, period=14)
+    indicators = cached_indicators(data, ['ATR', 'RSI', 'ADX'], cache, atr_period=14)
+    data['ATR'] = indicators['ATR']
     data['Stop Loss'] = data['Close'] - (1.5 * data['ATR'])
     data['Take Profit'] = data['Close'] + (1.5 * data['ATR'])
-    data['RSI'] = RSI_signal(data)
-    data['ADX'] = calculate_adx(data)['ADX']
+    data['RSI'] = indicators['RSI']
+    data['ADX'] = indicators['ADX']
     data['RSI_Signal'] = np.where(data['RSI'] < 30, 1, np.where(data['RSI'] > 70, -1, 0))
     data['ADX_Signal'] = np.where(data['ADX'] > 25, 1, 0)
     data['Combined_Signal'] = (rsi_weight * data['RSI_Signal'] + adx_weight * data['ADX_Signal']).round()
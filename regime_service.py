@@ -0,0 +1,269 @@
+"""Online market regime filtering.
+
+RegimeService fits the same scaler and 3-state Gaussian HMM as
+detect_regime.detect_regimes, but only once or every refit_every bars. Refits
+start from the previous parameters, so EM needs few iterations. Between fits
+each new bar is folded into the regime probabilities with one step of the
+forward algorithm, which costs O(states^2) instead of a Viterbi pass over the
+whole history.
+
+HMM states come out of each fit in arbitrary order. After a refit they are
+matched to the previous fit's states by their means, so a regime keeps its ID
+across refits and pairs_trading.pairs_trading_strategy sees consistent labels.
+
+    service = RegimeService(['Returns', 'Volatility'], refit_every=250)
+    data = service.fit(history)              # adds 'Regime'
+    probabilities = service.update(new_row)  # per bar
+    service.save('regimes.npz')
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from hmmlearn.hmm import GaussianHMM
+from scipy.optimize import linear_sum_assignment
+
+
+class RegimeService:
+    """
+    Persisted scaler and HMM with warm-started refits and per-bar filtering.
+
+    Requires:
+    features - Feature column names used for regime detection
+    n_states - Number of hidden regimes
+    n_iter - Maximum EM iterations of the first fit
+    warm_n_iter - Maximum EM iterations of a warm-started refit
+    refit_every - Refit after this many bars from update. None never refits
+    history - Number of most recent bars kept for refits
+    random_state - Seed of the first fit
+    """
+
+    def __init__(self, features, n_states=3, n_iter=1000, warm_n_iter=100, refit_every=None, history=5000,
+                 random_state=42):
+        self.features = list(features)
+        self.n_states = n_states
+        self.n_iter = n_iter
+        self.warm_n_iter = warm_n_iter
+        self.refit_every = refit_every
+        self.history = deque(maxlen=history)
+        self.random_state = random_state
+        self.model = None
+        self.scaler_mean = None
+        self.scaler_scale = None
+        # labels[s] is the stable regime ID of HMM state s.
+        self.labels = np.arange(n_states)
+        self.probabilities = None
+        self.bars_since_fit = 0
+        self.fits = []
+
+    def fit(self, data):
+        """
+        Fit the scaler and HMM on data, warm-starting from the current parameters
+        if there are any, and filter data through the new model.
+
+        Args:
+            data (DataFrame): Data containing the feature columns.
+
+        Returns:
+            DataFrame: data with a 'Regime' column of filtered (causal) regime IDs,
+            NaN where a feature is missing.
+        """
+
+        observations = data[self.features].dropna()
+        self.history.clear()
+        self.history.extend(observations.to_numpy(dtype=float))
+        self._fit(observations.to_numpy(dtype=float))
+
+        probabilities = self.filter(data)
+        data['Regime'] = np.nan
+        data.loc[observations.index, 'Regime'] = probabilities.loc[observations.index].to_numpy().argmax(axis=1)
+        return data
+
+    def update(self, row):
+        """
+        Fold one new bar into the regime probabilities, refitting first if a refit is due.
+
+        Args:
+            row: Feature values of the new bar, as a Series/dict keyed by feature or
+                a sequence in feature order.
+
+        Returns:
+            ndarray: Probability of each regime ID given every bar so far. A bar with
+            a missing feature only advances the transition step.
+        """
+
+        if self.model is None:
+            raise ValueError("RegimeService must be fit before update.")
+        if isinstance(row, (pd.Series, dict)):
+            row = [row[feature] for feature in self.features]
+        x = np.asarray(row, dtype=float)
+
+        if not np.isnan(x).any():
+            self.history.append(x)
+            self.bars_since_fit += 1
+            if self.refit_every is not None and self.bars_since_fit >= self.refit_every:
+                self._fit(np.array(self.history))
+                # Rebuild the filtered state under the new parameters.
+                self._forward(np.array(self.history))
+                return self.probabilities
+
+        self.probabilities = self._step(self.probabilities, self._likelihoods(x[None, :])[0])
+        return self.probabilities
+
+    @property
+    def regime(self):
+        """
+        Most likely current regime ID.
+        """
+
+        return int(np.argmax(self.probabilities))
+
+    def regime_means(self):
+        """
+        Mean feature values of each regime ID, in the features' own units.
+        """
+
+        means = np.empty_like(self.model.means_)
+        means[self.labels] = self.model.means_ * self.scaler_scale + self.scaler_mean
+        return means
+
+    def filter(self, data):
+        """
+        Run the forward algorithm over data with the current model and leave the
+        service positioned after its last bar.
+
+        Returns:
+            DataFrame: Probability of each regime ID per bar, indexed like data.
+        """
+
+        probabilities = self._forward(data[self.features].to_numpy(dtype=float))
+        return pd.DataFrame(probabilities, index=data.index, columns=list(range(self.n_states)))
+
+    def save(self, path):
+        """
+        Write the scaler, HMM parameters, labels, filter state and refit history to an .npz file.
+        """
+
+        np.savez(path, features=np.array(self.features), n_iter=self.n_iter, warm_n_iter=self.warm_n_iter,
+                 refit_every=-1 if self.refit_every is None else self.refit_every,
+                 history_length=self.history.maxlen, random_state=self.random_state,
+                 scaler_mean=self.scaler_mean, scaler_scale=self.scaler_scale,
+                 startprob=self.model.startprob_, transmat=self.model.transmat_, means=self.model.means_,
+                 covars=self.model._covars_, labels=self.labels, probabilities=self.probabilities,
+                 bars_since_fit=self.bars_since_fit, history=np.array(self.history).reshape(-1, len(self.features)))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Rebuild a service written by save, ready to continue with update.
+        """
+
+        with np.load(path) as state:
+            refit_every = int(state['refit_every'])
+            service = cls(state['features'].tolist(), n_states=len(state['startprob']), n_iter=int(state['n_iter']),
+                          warm_n_iter=int(state['warm_n_iter']), refit_every=None if refit_every < 0 else refit_every,
+                          history=int(state['history_length']), random_state=int(state['random_state']))
+            service.scaler_mean = state['scaler_mean']
+            service.scaler_scale = state['scaler_scale']
+            service.model = service._new_model(service.warm_n_iter, init_params='')
+            service.model.startprob_ = state['startprob']
+            service.model.transmat_ = state['transmat']
+            service.model.means_ = state['means']
+            service.model.covars_ = state['covars']
+            service.labels = state['labels']
+            service.probabilities = state['probabilities']
+            service.bars_since_fit = int(state['bars_since_fit'])
+            service.history.extend(state['history'])
+        return service
+
+    def _new_model(self, n_iter, init_params='stmc'):
+        return GaussianHMM(n_components=self.n_states, covariance_type='diag', n_iter=n_iter,
+                           random_state=self.random_state, init_params=init_params)
+
+    def _fit(self, observations):
+        # StandardScaler's statistics; a constant feature is left unscaled.
+        mean = observations.mean(axis=0)
+        scale = observations.std(axis=0)
+        scale[scale == 0] = 1.0
+        scaled = (observations - mean) / scale
+
+        started = time.perf_counter()
+        previous = self.model
+        if previous is None:
+            model = self._new_model(self.n_iter)
+        else:
+            # Carry the previous states over, re-expressed in the new scaling.
+            model = self._new_model(self.warm_n_iter, init_params='')
+            model.startprob_ = previous.startprob_
+            model.transmat_ = previous.transmat_
+            model.means_ = (previous.means_ * self.scaler_scale + self.scaler_mean - mean) / scale
+            model.covars_ = previous._covars_ * (self.scaler_scale / scale) ** 2
+        model.fit(scaled)
+
+        if previous is not None:
+            self.labels = self._match_labels(previous, model, mean, scale)
+        self.fits.append({'bars': len(observations), 'seconds': time.perf_counter() - started,
+                          'iterations': model.monitor_.iter,
+                          'converged': model.monitor_.converged, 'warm_start': previous is not None})
+        self.model = model
+        self.scaler_mean = mean
+        self.scaler_scale = scale
+        self.bars_since_fit = 0
+
+    def _match_labels(self, previous, model, mean, scale):
+        """
+        Give each new state the label of the previous state whose mean, in feature
+        units, is closest.
+        """
+
+        old_means = previous.means_ * self.scaler_scale + self.scaler_mean
+        new_means = model.means_ * scale + mean
+        spread = np.where(self.scaler_scale > 0, self.scaler_scale, 1.0)
+        cost = (((new_means[:, None, :] - old_means[None, :, :]) / spread) ** 2).sum(axis=2)
+        new_states, old_states = linear_sum_assignment(cost)
+        labels = np.empty(self.n_states, dtype=int)
+        labels[new_states] = self.labels[old_states]
+        return labels
+
+    def _likelihoods(self, observations):
+        """
+        Emission likelihood of each observation under each state, rescaled per
+        observation (the scale cancels when the forward step normalizes).
+        NaN rows give equal likelihoods.
+        """
+
+        scaled = (observations - self.scaler_mean) / self.scaler_scale
+        variances = self.model._covars_
+        log_likelihoods = -0.5 * (np.log(2 * np.pi * variances).sum(axis=1) +
+                                  (((scaled[:, None, :] - self.model.means_) ** 2) / variances).sum(axis=2))
+        log_likelihoods[np.isnan(log_likelihoods)] = 0.0
+        log_likelihoods -= log_likelihoods.max(axis=1, keepdims=True)
+        return np.exp(log_likelihoods)
+
+    def _step(self, probabilities, likelihoods):
+        # Filtering state is kept in stable label order; the model works in state order.
+        state_probabilities = probabilities[self.labels]
+        alpha = (state_probabilities @ self.model.transmat_) * likelihoods
+        alpha /= alpha.sum()
+        result = np.empty_like(alpha)
+        result[self.labels] = alpha
+        return result
+
+    def _forward(self, observations):
+        likelihoods = self._likelihoods(observations)
+        output = np.empty((len(observations), self.n_states))
+        transmat = self.model.transmat_
+        alpha = None
+        for t, likelihood in enumerate(likelihoods):
+            alpha = self.model.startprob_ * likelihood if alpha is None else (alpha @ transmat) * likelihood
+            alpha /= alpha.sum()
+            output[t, self.labels] = alpha
+
+        self.probabilities = np.empty(self.n_states)
+        if alpha is None:
+            self.probabilities[self.labels] = self.model.startprob_
+        else:
+            self.probabilities[self.labels] = alpha
+        return output
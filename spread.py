@@ -1,4 +1,13 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Windows up to this length are scored exactly, each against its own mean;
+# longer ones from running sums over blocks of _ZSCORE_BLOCKS_PER_WINDOW windows,
+# centred per block so the sums stay close to the scale of one window.
+_ZSCORE_EXACT_WINDOW = 32
+_ZSCORE_BLOCKS_PER_WINDOW = 8
+# Window values held at once by the exact path.
+_ZSCORE_CHUNK = 1 << 20
 
 
 def calculate_spread_and_signals(data, stock_a_col, stock_b_col, hedging_ratio):
@@ -24,3 +33,153 @@ def calculate_spread_and_signals(data, stock_a_col, stock_b_col, hedging_ratio):
     data.loc[data['Spread'] < spread_mean - 2 * spread_std, 'Signal'] = 1   # Long
 
     return data
+
+
+def calculate_rolling_spread_and_signals(data, stock_a_col, stock_b_col, hedging_ratio, window=60,
+                                         entry_z=2.0, exit_z=0.5):
+    """
+    Calculate the spread between two stocks and generate trading signals from its rolling z-score.
+
+    Unlike calculate_spread_and_signals, each bar is scored against the trailing
+    window only, so no future prices leak into the signal.
+
+    Args:
+        data (DataFrame): Data containing price columns for stocks.
+        stock_a_col (str): Column name for Stock A prices.
+        stock_b_col (str): Column name for Stock B prices.
+        hedging_ratio (float): Hedging ratio between Stock A and Stock B.
+        window (int): Lookback period for the rolling mean and std.
+        entry_z (float): Z-score at which a position is opened.
+        exit_z (float): Z-score at which an open position is closed.
+
+    Returns:
+        DataFrame: Updated DataFrame with 'Spread', 'Z-Score' and 'Signal' columns.
+    """
+
+    data['Spread'] = data[stock_a_col] - (hedging_ratio * data[stock_b_col])
+    zscore = rolling_zscore(data['Spread'].to_numpy(dtype=float), window)
+    data['Z-Score'] = zscore
+    data['Signal'] = zscore_signals(zscore, entry_z, exit_z)
+
+    return data
+
+
+def rolling_zscore(spread, window):
+    """
+    Rolling z-score of one or many spreads.
+
+    Windows of up to _ZSCORE_EXACT_WINDOW bars are scored with a two-pass
+    variance per window. Longer windows use running sums in O(bars), centred per
+    block of a few windows, which stays within about 1e-12 of the two-pass
+    z-score.
+
+    Args:
+        spread (ndarray): Spreads, shape (bars,) or (bars, pairs).
+        window (int): Lookback period for the rolling mean and std.
+
+    Returns:
+        ndarray: Z-scores with the shape of spread. Bars whose window is not yet
+        full, or contains a NaN, are NaN.
+    """
+
+    spread = np.asarray(spread, dtype=float)
+    if window < 2:
+        raise ValueError("window must be at least 2.")
+
+    zscore = np.full(spread.shape, np.nan)
+    n = len(spread)
+    width = spread[0].size if n else 1
+
+    if window <= _ZSCORE_EXACT_WINDOW:
+        # Short windows: squared deviations from each window's own mean, taken
+        # relative to the window's last value so a large level cancels exactly.
+        rows = max(1, _ZSCORE_CHUNK // (window * width))
+        for start in range(window - 1, n, rows):
+            stop = min(start + rows, n)
+            windows = sliding_window_view(spread[start - window + 1:stop], window, axis=0)
+            windows = windows - spread[start:stop, ..., None]
+            mean = windows.mean(axis=-1)
+            windows -= mean[..., None]
+            std = np.sqrt(np.einsum('...i,...i->...', windows, windows) / (window - 1))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                zscore[start:stop] = -mean / std
+        return zscore
+
+    block = _ZSCORE_BLOCKS_PER_WINDOW * window
+    for start in range(window - 1, n, block):
+        stop = min(start + block, n)
+        lo = start - window + 1
+        values = spread[lo:stop]
+        valid = ~np.isnan(values)
+        # Centre each block so the running sums stay small; the z-score does not
+        # depend on the centre.
+        with np.errstate(invalid='ignore'):
+            centre = np.nan_to_num(np.nanmean(values[:window], axis=0))
+        values = np.where(valid, values - centre, 0.0)
+
+        sums = []
+        for running in (np.cumsum(valid, axis=0), np.cumsum(values, axis=0), np.cumsum(values * values, axis=0)):
+            total = running[window - 1:].astype(float)
+            total[1:] -= running[:-window]
+            sums.append(total)
+        count, total, total_sq = sums
+
+        mean = total / window
+        std = np.sqrt(np.maximum(total_sq - total * mean, 0.0) / (window - 1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            zscore[start:stop] = np.where(count == window, (values[window - 1:] - mean) / std, np.nan)
+
+    return zscore
+
+
+def zscore_signals(zscore, entry_z=2.0, exit_z=0.5):
+    """
+    Turn z-scores into held positions for one or many spreads at once.
+
+    A long position opens when the z-score falls below -entry_z and is held
+    until it rises to -exit_z or above. A short position opens above entry_z
+    and is held until it falls to exit_z or below. A move straight across to
+    the other entry threshold reverses the position on that bar.
+
+    Args:
+        zscore (ndarray): Z-scores, shape (bars,) or (bars, pairs).
+        entry_z (float or ndarray): Z-score at which a position is opened, or one per spread.
+        exit_z (float or ndarray): Z-score at which an open position is closed, or one per spread.
+
+    Returns:
+        ndarray: Signals of 1 (long), -1 (short) or 0 (flat) with the shape of zscore.
+    """
+
+    if not np.all((0 <= np.asarray(exit_z)) & (np.asarray(exit_z) < np.asarray(entry_z))):
+        raise ValueError("Thresholds must satisfy 0 <= exit_z < entry_z.")
+
+    zscore = np.asarray(zscore, dtype=float)
+    with np.errstate(invalid='ignore'):
+        long_entry = zscore < -entry_z
+        short_entry = zscore > entry_z
+        long_hold = (zscore < -exit_z) & ~long_entry
+        short_hold = (zscore > exit_z) & ~short_entry
+
+    # Every bar outside a holding zone sets the state outright (NaN z-scores
+    # close out). Inside a zone the state is whatever held on the last bar
+    # outside it, kept only if it is the position that zone holds.
+    settled = np.where(long_entry, 1, np.where(short_entry, -1, 0)).astype(np.int8)
+    held_long = _last_outside(settled, long_hold) == 1
+    held_short = _last_outside(settled, short_hold) == -1
+
+    return np.where(long_hold, held_long, np.where(short_hold, -held_short.astype(np.int8), settled)).astype(np.int8)
+
+
+def _last_outside(values, zone):
+    """
+    For each bar, the value on the latest bar at or before it that lies outside zone (0 if none).
+
+    values must lie in {-1, 0, 1}. Each bar is encoded as 4 * row + value + 1, so
+    a running maximum carries the latest row and its value together.
+    """
+
+    dtype = np.int32 if 4 * len(values) < np.iinfo(np.int32).max else np.int64
+    rows = np.arange(len(values), dtype=dtype).reshape((-1,) + (1,) * (values.ndim - 1))
+    last = np.maximum.accumulate(np.where(zone, dtype(-1), 4 * rows + values + 1), axis=0)
+
+    return np.where(last >= 0, last % 4 - 1, 0)
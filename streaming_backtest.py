@@ -0,0 +1,188 @@
+"""Out-of-core backtest over bars that do not fit in memory.
+
+streaming_backtest runs the indicator and signal steps of
+preprocessing.preprocess_pairs (ATR stop-loss/take-profit levels, RSI and ADX
+signals, weighted Combined_Signal) and then backtest.simulate, one fixed-size
+block of bars at a time. Inputs are read block by block from memory-mapped
+arrays such as bar_store.BarStore.read returns, and outputs are written block
+by block to memory-mapped .npy files, so peak memory depends on block_size
+and not on the length of the history.
+
+State crosses block boundaries in two ways. The indicators see the last
+warm-up bars of the previous block again, which covers every rolling window
+they read. The backtest carries its cash and shares. Rolling means are summed
+window by window rather than with running totals, so each value depends only
+on the bars in its window and the output is identical for every block_size,
+including one block holding the whole history.
+
+    bars = BarStore('bars').read('nyse', 'GLD', columns=('High', 'Low', 'Close'))
+    outputs, summary = streaming_backtest(bars, output_dir='gld_backtest')
+"""
+
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtest import TRADE_TYPES, simulate
+from indicator_pipeline import DEFAULT_PARAMS
+
+OUTPUTS = {
+    'Position': np.int64,
+    'Portfolio Value': None,
+    'Trade Returns': None,
+    'Combined_Signal': np.int8,
+}
+
+
+def streaming_backtest(bars, rsi_weight=0.5, adx_weight=0.5, initial_cash=100000, block_size=1 << 20,
+                       dtype=np.float64, output_dir=None, atr_period=DEFAULT_PARAMS['atr_period'],
+                       adx_period=DEFAULT_PARAMS['adx_period'], rsi_period=DEFAULT_PARAMS['rsi_period']):
+    """
+    Backtest one instrument block by block.
+
+    Args:
+        bars (dict): 'High', 'Low' and 'Close' arrays, typically memory-mapped.
+        rsi_weight (float): Weight assigned to RSI signals (0 to 1).
+        adx_weight (float): Weight assigned to ADX signals (0 to 1).
+        initial_cash (float): Initial cash amount for the backtest.
+        block_size (int): Bars processed per block.
+        dtype: np.float64, or np.float32 to halve the memory of the indicator
+            arrays. Cash is always accounted in float64.
+        output_dir (str): Directory for the memory-mapped output files, one .npy per
+            entry of OUTPUTS. If None, the outputs are kept in memory.
+
+    Returns:
+        dict: Output name -> array of one value per bar ('Position', 'Portfolio
+        Value', 'Trade Returns', 'Combined_Signal').
+        dict: 'Final Portfolio Value', 'Total Return' and the number of trades of
+        each type ('buy', 'sell', 'exit').
+    """
+
+    high, low, close = bars['High'], bars['Low'], bars['Close']
+    n = len(close)
+    dtype = np.dtype(dtype).type
+    if block_size < 1:
+        raise ValueError(f"block_size must be positive, got {block_size}.")
+    warmup = max(atr_period, rsi_period, 2 * adx_period) + 1
+
+    outputs = {}
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    for name, output_dtype in OUTPUTS.items():
+        output_dtype = output_dtype or dtype
+        if output_dir is None:
+            outputs[name] = np.empty(n, dtype=output_dtype)
+        else:
+            path = os.path.join(output_dir, name.replace(' ', '_').lower() + '.npy')
+            outputs[name] = np.lib.format.open_memmap(path, mode='w+', dtype=output_dtype, shape=(n,))
+
+    cash, shares = float(initial_cash), 0
+    previous_value = np.nan
+    trade_counts = np.zeros(len(TRADE_TYPES), dtype=np.int64)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        lo = max(start - warmup, 0)
+        block_high, block_low, block_close = (np.asarray(values[lo:stop], dtype=dtype)
+                                              for values in (high, low, close))
+
+        atr, rsi, adx = block_indicators(block_high, block_low, block_close, atr_period, adx_period, rsi_period)
+        rows = slice(start - lo, stop - lo)
+        price = block_close[rows]
+        stop_loss = price - dtype(1.5) * atr[rows]
+        take_profit = price + dtype(1.5) * atr[rows]
+        rsi_signal = np.where(rsi[rows] < 30, 1, np.where(rsi[rows] > 70, -1, 0))
+        adx_signal = np.where(adx[rows] > 25, 1, 0)
+        signal = np.round(rsi_weight * rsi_signal + adx_weight * adx_signal)
+
+        price = price.astype(np.float64)
+        exit_hit = np.zeros(len(price), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for level, hit in ((stop_loss, price <= stop_loss), (take_profit, price >= take_profit)):
+                exit_hit |= (level != 0) & hit
+
+        position = np.zeros(len(price), dtype=np.int64)
+        portfolio_value = np.empty(len(price))
+        events = []
+        cash, shares = simulate(price, signal, exit_hit, cash, shares, position, portfolio_value, events)
+        for _, kinds, _ in events:
+            trade_counts += np.bincount(kinds, minlength=len(TRADE_TYPES))
+
+        trade_returns = np.empty(len(price))
+        trade_returns[0] = portfolio_value[0] / previous_value - 1
+        trade_returns[1:] = portfolio_value[1:] / portfolio_value[:-1] - 1
+        previous_value = portfolio_value[-1]
+
+        outputs['Position'][start:stop] = position
+        outputs['Portfolio Value'][start:stop] = portfolio_value
+        outputs['Trade Returns'][start:stop] = trade_returns
+        outputs['Combined_Signal'][start:stop] = signal
+
+    for values in outputs.values():
+        if isinstance(values, np.memmap):
+            values.flush()
+
+    final_value = float(outputs['Portfolio Value'][-1]) if n else float(initial_cash)
+    summary = {'Final Portfolio Value': final_value, 'Total Return': final_value / initial_cash - 1}
+    summary.update(zip(TRADE_TYPES.tolist(), trade_counts.tolist()))
+    return outputs, summary
+
+
+def block_indicators(high, low, close, atr_period=14, adx_period=14, rsi_period=14):
+    """
+    ATR, RSI and ADX as in indicator_pipeline, in the dtype of the inputs.
+
+    Every rolling mean is summed over its own window, so a value depends only on
+    the bars it covers and not on where the arrays start.
+
+    Returns:
+        tuple: (ATR, RSI, ADX) arrays.
+    """
+
+    prev_close = _shift(close)
+    prev_high = _shift(high)
+    prev_low = _shift(low)
+    true_range = np.fmax(high - low, np.fmax(abs(high - prev_close), abs(low - prev_close)))
+    atr = _window_mean(true_range, atr_period)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = close - prev_close
+        gains = np.where(delta > 0, delta, 0).astype(close.dtype)
+        losses = np.where(delta < 0, -delta, 0).astype(close.dtype)
+        rsi = 100 - (100 / (1 + _window_mean(gains, rsi_period, 1) / _window_mean(losses, rsi_period, 1)))
+
+        up_move = high - prev_high
+        down_move = prev_low - low
+        dm_plus = np.where(up_move > down_move, np.maximum(up_move, 0), 0).astype(close.dtype)
+        dm_minus = np.where(down_move > up_move, np.maximum(down_move, 0), 0).astype(close.dtype)
+        true_range_sma = _window_mean(np.where(np.isnan(prev_close), np.nan, true_range).astype(close.dtype),
+                                      adx_period)
+        di_plus = 100 * (dm_plus / true_range_sma)
+        di_minus = 100 * (dm_minus / true_range_sma)
+        dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
+    adx = _window_mean(dx, adx_period)
+
+    return atr, rsi, adx
+
+
+def _shift(values):
+    shifted = np.empty_like(values)
+    shifted[:1] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def _window_mean(values, period, min_periods=None):
+    """
+    Rolling mean with pandas semantics (NaNs skipped, at least min_periods values),
+    each window summed on its own.
+    """
+
+    min_periods = period if min_periods is None else min_periods
+    valid = ~np.isnan(values)
+    padded = np.concatenate((np.zeros(period - 1, dtype=values.dtype), np.where(valid, values, 0)))
+    counts = np.concatenate((np.zeros(period - 1, dtype=np.int64), valid.astype(np.int64)))
+    total = sliding_window_view(padded, period).sum(axis=1)
+    count = sliding_window_view(counts, period).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= min_periods, total / count, np.nan).astype(values.dtype)
@@ -0,0 +1,204 @@
+"""Incremental versions of ATR.ATR, ADX.calculate_adx, RSI_signal and MACD.MACD.
+
+Each indicator takes one bar at a time and returns its latest value in
+constant time and memory, matching the batch function bar for bar. Every
+class is array-backed: pass n_symbols > 1 and arrays of prices to update
+many symbols in one call.
+"""
+
+import numpy as np
+
+
+class _RollingMean:
+    """
+    Ring-buffer rolling mean with pandas semantics: a window needs at least
+    min_periods non-NaN values, and NaNs are otherwise skipped.
+    """
+
+    __slots__ = ('period', 'min_periods', 'buffer', 'is_nan', 'position', 'filled', 'total', 'nan_count')
+
+    def __init__(self, period, n_symbols, min_periods=None):
+        self.period = period
+        self.min_periods = period if min_periods is None else min_periods
+        self.buffer = np.zeros((period, n_symbols))
+        self.is_nan = np.zeros((period, n_symbols), dtype=bool)
+        self.position = 0
+        self.filled = 0
+        self.total = np.zeros(n_symbols)
+        self.nan_count = np.zeros(n_symbols, dtype=np.int64)
+
+    def update(self, value):
+        value_is_nan = np.isnan(value)
+        value = np.where(value_is_nan, 0.0, value)
+        if self.filled == self.period:
+            self.total -= self.buffer[self.position]
+            self.nan_count -= self.is_nan[self.position]
+        else:
+            self.filled += 1
+
+        self.buffer[self.position] = value
+        self.is_nan[self.position] = value_is_nan
+        self.total += value
+        self.nan_count += value_is_nan
+        self.position = (self.position + 1) % self.period
+        # Resum the window once per lap so rounding error cannot build up.
+        if self.position == 0:
+            self.total = self.buffer.sum(axis=0)
+
+        count = self.filled - self.nan_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count >= self.min_periods, self.total / count, np.nan)
+
+
+class StreamingATR:
+    """
+    Average True Range, updated one bar at a time.
+
+    Requires:
+    period - Lookback period for the moving average of True Range
+    n_symbols - Number of symbols updated together
+    """
+
+    __slots__ = ('prev_close', 'true_range_mean')
+
+    def __init__(self, period: int, n_symbols=1):
+        self.prev_close = np.full(n_symbols, np.nan)
+        self.true_range_mean = _RollingMean(period, n_symbols)
+
+    def update(self, high, low, close):
+        """
+        Returns:
+            ndarray: Latest ATR per symbol.
+        """
+
+        high, low, close = (np.asarray(x, dtype=float) for x in (high, low, close))
+        # Like DataFrame.max(axis=1), the missing previous close on the first bar is skipped.
+        true_range = np.fmax(high - low, np.fmax(abs(high - self.prev_close), abs(low - self.prev_close)))
+        self.prev_close = np.broadcast_to(close, self.prev_close.shape).copy()
+
+        return self.true_range_mean.update(true_range)
+
+
+class StreamingADX:
+    """
+    Average Directional Index, updated one bar at a time.
+
+    Requires:
+    period - Lookback period for ADX calculation
+    n_symbols - Number of symbols updated together
+    """
+
+    __slots__ = ('prev_high', 'prev_low', 'prev_close', 'true_range_mean', 'dx_mean')
+
+    def __init__(self, period=14, n_symbols=1):
+        self.prev_high = np.full(n_symbols, np.nan)
+        self.prev_low = np.full(n_symbols, np.nan)
+        self.prev_close = np.full(n_symbols, np.nan)
+        self.true_range_mean = _RollingMean(period, n_symbols)
+        self.dx_mean = _RollingMean(period, n_symbols)
+
+    def update(self, high, low, close):
+        """
+        Returns:
+            tuple: (ADX, DI+, DI-) arrays, one entry per symbol.
+        """
+
+        high, low, close = (np.asarray(x, dtype=float) for x in (high, low, close))
+        true_range = np.maximum(high - low, np.maximum(abs(high - self.prev_close), abs(low - self.prev_close)))
+        up_move = high - self.prev_high
+        down_move = self.prev_low - low
+        with np.errstate(invalid='ignore'):
+            dm_plus = np.where(up_move > down_move, np.maximum(up_move, 0), 0)
+            dm_minus = np.where(down_move > up_move, np.maximum(down_move, 0), 0)
+
+        shape = self.prev_close.shape
+        self.prev_high = np.broadcast_to(high, shape).copy()
+        self.prev_low = np.broadcast_to(low, shape).copy()
+        self.prev_close = np.broadcast_to(close, shape).copy()
+
+        true_range_sma = self.true_range_mean.update(true_range)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            di_plus = 100 * (dm_plus / true_range_sma)
+            di_minus = 100 * (dm_minus / true_range_sma)
+            dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
+
+        return self.dx_mean.update(dx), di_plus, di_minus
+
+
+class StreamingRSI:
+    """
+    Relative Strength Index, updated one bar at a time.
+
+    Requires:
+    period - Lookback period for the average gain and loss
+    n_symbols - Number of symbols updated together
+    """
+
+    __slots__ = ('prev_price', 'gain_mean', 'loss_mean')
+
+    def __init__(self, period: int = 14, n_symbols=1):
+        self.prev_price = np.full(n_symbols, np.nan)
+        self.gain_mean = _RollingMean(period, n_symbols, min_periods=1)
+        self.loss_mean = _RollingMean(period, n_symbols, min_periods=1)
+
+    def update(self, price):
+        """
+        Returns:
+            ndarray: Latest RSI per symbol.
+        """
+
+        price = np.asarray(price, dtype=float)
+        delta = price - self.prev_price
+        self.prev_price = np.broadcast_to(price, self.prev_price.shape).copy()
+        with np.errstate(invalid='ignore'):
+            gains = np.where(delta > 0, delta, 0)
+            losses = np.where(delta < 0, -delta, 0)
+
+        avg_gain = self.gain_mean.update(gains)
+        avg_loss = self.loss_mean.update(losses)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+
+
+class StreamingMACD:
+    """
+    MACD, signal line and histogram, updated one bar at a time.
+
+    Requires:
+    short_period - Span of the short EMA
+    long_period - Span of the long EMA
+    signal_period - Span of the signal line EMA of MACD
+    n_symbols - Number of symbols updated together
+    """
+
+    __slots__ = ('alphas', 'ema_short', 'ema_long', 'signal_line')
+
+    def __init__(self, short_period: int, long_period: int, signal_period: int, n_symbols=1):
+        self.alphas = tuple(2 / (span + 1) for span in (short_period, long_period, signal_period))
+        self.ema_short = np.full(n_symbols, np.nan)
+        self.ema_long = np.full(n_symbols, np.nan)
+        self.signal_line = np.full(n_symbols, np.nan)
+
+    def update(self, close):
+        """
+        Returns:
+            tuple: (MACD, Signal_Line, Histogram) arrays, one entry per symbol.
+        """
+
+        close = np.asarray(close, dtype=float)
+        short_alpha, long_alpha, signal_alpha = self.alphas
+        self.ema_short = _ema_step(self.ema_short, close, short_alpha)
+        self.ema_long = _ema_step(self.ema_long, close, long_alpha)
+        macd = self.ema_short - self.ema_long
+        self.signal_line = _ema_step(self.signal_line, macd, signal_alpha)
+
+        return macd, self.signal_line, macd - self.signal_line
+
+
+def _ema_step(ema, value, alpha):
+    """
+    One step of ewm(adjust=False): the first observation seeds the average.
+    """
+
+    return np.where(np.isnan(ema), value, (1 - alpha) * ema + alpha * value)
@@ -0,0 +1,298 @@
+"""One table of symbol metadata built from every listing file.
+
+Listings, the S&P 500 constituents, ETFs and share-class groups are merged
+into a single array-backed table with one integer ID per symbol. Exchange and
+GICS sector are stored as small integer codes into category tuples, so the
+table stays compact, and a dict gives O(1) symbol -> ID lookup. The table can
+be saved to an .npz cache that later sessions load without parsing any CSV.
+
+    master = SymbolMaster.load('.', cache_path='symbol_master.npz')
+    master.info('GOOGL')
+    master.share_class('GOOGL')                  # ['GOOG', 'GOOGL']
+    master.select(exchange='nyse', sector='Energy')
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Exchange -> (listing file, symbol column, name column)
+EXCHANGE_LISTINGS = {
+    'nyse': ('nyse-listed.csv', 'ACT Symbol', 'Company Name'),
+    'nasdaq': ('nasdaq-listed.csv', 'Symbol', 'Security Name'),
+}
+SNP_INDIVIDUAL_FILE = 'snp_individual.csv'
+ETFS_FILE = 'etfs.csv'
+SHARE_CLASS_FILES = ('share_classes_nasdaq.csv', 'share_classes_nyse.csv', 'share_classes_snp_individual.csv')
+
+_ARRAYS = ('symbols', 'names', 'exchange_codes', 'sector_codes', 'is_etf', 'in_snp500', 'groups')
+
+
+def _read_csv(path, **kwargs):
+    # Tickers such as "NA" must not be read as missing values.
+    return pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[''], **kwargs)
+
+
+class SymbolMaster:
+    """
+    Symbol metadata table with integer symbol IDs.
+
+    Missing exchange, sector or share-class group are coded as -1.
+
+    Requires:
+    symbols - Ticker symbols, one per ID
+    names - Security or company name of each symbol
+    exchange_codes - Index into exchanges for each symbol
+    exchanges - Exchange names
+    sector_codes - Index into sectors for each symbol
+    sectors - GICS sector names
+    is_etf - Whether each symbol is listed in etfs.csv
+    in_snp500 - Whether each symbol is an S&P 500 constituent
+    groups - Share-class group of each symbol
+    """
+
+    def __init__(self, symbols, names, exchange_codes, exchanges, sector_codes, sectors, is_etf, in_snp500, groups):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.names = np.asarray(names, dtype=str)
+        self.exchange_codes = np.asarray(exchange_codes, dtype=np.int8)
+        self.exchanges = tuple(str(exchange) for exchange in exchanges)
+        self.sector_codes = np.asarray(sector_codes, dtype=np.int8)
+        self.sectors = tuple(str(sector) for sector in sectors)
+        self.is_etf = np.asarray(is_etf, dtype=bool)
+        self.in_snp500 = np.asarray(in_snp500, dtype=bool)
+        self.groups = np.asarray(groups, dtype=np.int32)
+        self.ids_by_symbol = {symbol: i for i, symbol in enumerate(self.symbols.tolist())}
+
+        # Members of each group, as slices of one array of IDs sorted by group.
+        order = np.argsort(self.groups, kind='stable')
+        order = order[self.groups[order] >= 0]
+        self.group_members = order
+        self.group_starts = np.searchsorted(self.groups[order], np.arange(self.groups.max(initial=-1) + 2))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.ids_by_symbol
+
+    def id(self, symbol):
+        """
+        Integer ID of a symbol. Raises KeyError for unknown symbols.
+        """
+
+        try:
+            return self.ids_by_symbol[symbol]
+        except KeyError:
+            raise KeyError(f"Unknown symbol '{symbol}'.") from None
+
+    def ids(self, symbols):
+        """
+        Integer IDs of many symbols, -1 for unknown ones.
+        """
+
+        return np.fromiter((self.ids_by_symbol.get(symbol, -1) for symbol in symbols), dtype=np.int64)
+
+    def info(self, symbol):
+        """
+        Returns:
+            dict: 'Symbol', 'Name', 'Exchange', 'GICS Sector', 'ETF', 'S&P 500' and
+            'Share Class Group' of the symbol, with None where not known.
+        """
+
+        i = self.id(symbol)
+        exchange, sector, group = self.exchange_codes[i], self.sector_codes[i], self.groups[i]
+        return {
+            'Symbol': str(self.symbols[i]),
+            'Name': str(self.names[i]),
+            'Exchange': self.exchanges[exchange] if exchange >= 0 else None,
+            'GICS Sector': self.sectors[sector] if sector >= 0 else None,
+            'ETF': bool(self.is_etf[i]),
+            'S&P 500': bool(self.in_snp500[i]),
+            'Share Class Group': int(group) if group >= 0 else None,
+        }
+
+    def share_class(self, symbol):
+        """
+        Symbols in the same share-class group as symbol, including itself.
+        Just [symbol] if it has no other classes.
+        """
+
+        group = self.groups[self.id(symbol)]
+        if group < 0:
+            return [symbol]
+        return self.symbols[self.group_members[self.group_starts[group]:self.group_starts[group + 1]]].tolist()
+
+    def select(self, exchange=None, sector=None, etf=None, snp500=None, in_share_class=None):
+        """
+        IDs of the symbols matching every given filter.
+
+        Args:
+            exchange (str or list): Exchange name(s), e.g. 'nyse'.
+            sector (str or list): GICS sector name(s), e.g. 'Energy'.
+            etf (bool): Only ETFs (True) or only non-ETFs (False).
+            snp500 (bool): Only S&P 500 constituents (True) or only non-constituents (False).
+            in_share_class (bool): Only symbols with (True) or without (False) a share-class group.
+
+        Returns:
+            ndarray: Matching symbol IDs in ascending order. Use master.symbols[ids]
+            for the tickers.
+        """
+
+        mask = np.ones(len(self), dtype=bool)
+        if exchange is not None:
+            mask &= np.isin(self.exchange_codes, self._codes(self.exchanges, exchange, 'exchange'))
+        if sector is not None:
+            mask &= np.isin(self.sector_codes, self._codes(self.sectors, sector, 'sector'))
+        if etf is not None:
+            mask &= self.is_etf == etf
+        if snp500 is not None:
+            mask &= self.in_snp500 == snp500
+        if in_share_class is not None:
+            mask &= (self.groups >= 0) == in_share_class
+        return np.flatnonzero(mask)
+
+    def to_frame(self):
+        """
+        The table as a DataFrame indexed by symbol ID, with categorical exchange and sector.
+        """
+
+        return pd.DataFrame({
+            'Symbol': self.symbols,
+            'Name': self.names,
+            'Exchange': pd.Categorical.from_codes(self.exchange_codes, self.exchanges),
+            'GICS Sector': pd.Categorical.from_codes(self.sector_codes, self.sectors),
+            'ETF': self.is_etf,
+            'S&P 500': self.in_snp500,
+            'Share Class Group': self.groups,
+        })
+
+    @classmethod
+    def from_csv(cls, data_dir='.'):
+        """
+        Build the table from the listing, S&P 500, ETF and share-class CSVs in data_dir.
+        Files that do not exist are skipped.
+        """
+
+        frames = []
+        for exchange, (filename, symbol_column, name_column) in EXCHANGE_LISTINGS.items():
+            path = os.path.join(data_dir, filename)
+            if os.path.exists(path):
+                listing = _read_csv(path, usecols=[symbol_column, name_column])
+                frames.append(pd.DataFrame({'Symbol': listing[symbol_column], 'Name': listing[name_column],
+                                            'Exchange': exchange}))
+
+        path = os.path.join(data_dir, SNP_INDIVIDUAL_FILE)
+        snp = _read_csv(path, index_col=0) if os.path.exists(path) else pd.DataFrame(
+            columns=['Symbol', 'Security', 'GICS Sector'])
+        frames.append(pd.DataFrame({'Symbol': snp['Symbol'], 'Name': snp['Security']}))
+
+        path = os.path.join(data_dir, ETFS_FILE)
+        etfs = _read_csv(path)['Symbol'] if os.path.exists(path) else pd.Series(dtype=str)
+        frames.append(pd.DataFrame({'Symbol': etfs}))
+
+        # The first file a symbol appears in provides its name and exchange.
+        table = pd.concat(frames, ignore_index=True).dropna(subset=['Symbol'])
+        table['Symbol'] = table['Symbol'].str.strip()
+        table = table.drop_duplicates(subset='Symbol', ignore_index=True)
+        ids = pd.Index(table['Symbol'])
+
+        exchange_codes, exchanges = pd.factorize(table['Exchange'])
+        sectors_by_symbol = snp.drop_duplicates(subset='Symbol').set_index('Symbol')['GICS Sector']
+        sector_codes, sectors = pd.factorize(table['Symbol'].map(sectors_by_symbol))
+
+        groups = np.full(len(table), -1, dtype=np.int32)
+        next_group = 0
+        for filename in SHARE_CLASS_FILES:
+            path = os.path.join(data_dir, filename)
+            if not os.path.exists(path):
+                continue
+            share_classes = _read_csv(path)
+            symbols = share_classes.iloc[:, 0].str.strip()
+            if 'Group ID' in share_classes.columns:
+                local_groups = share_classes['Group ID'].astype(int).to_numpy()
+            else:
+                first_words = share_classes.iloc[:, 1].str.strip('"').str.split().str[0]
+                local_groups = (first_words != first_words.shift()).cumsum().to_numpy()
+            local_groups = pd.factorize(local_groups)[0]
+
+            # Keep the group from an earlier (exchange) file where a symbol is in two.
+            positions = ids.get_indexer(symbols)
+            free = (positions >= 0) & (groups[np.maximum(positions, 0)] < 0)
+            groups[positions[free]] = next_group + local_groups[free]
+            next_group += local_groups.max(initial=-1) + 1
+
+        # Renumber so group IDs are dense after groups that lost every member.
+        in_group = groups >= 0
+        groups[in_group] = pd.factorize(groups[in_group])[0]
+
+        return cls(table['Symbol'].to_numpy(), table['Name'].fillna('').to_numpy(), exchange_codes, exchanges,
+                   sector_codes, sectors, table['Symbol'].isin(etfs), table['Symbol'].isin(snp['Symbol']), groups)
+
+    @classmethod
+    def load(cls, data_dir='.', cache_path=None):
+        """
+        Load from cache_path if it was built from the current CSVs, otherwise build
+        from the CSVs and, when cache_path is given, write the cache.
+        """
+
+        fingerprint = _fingerprint(data_dir)
+        if cache_path is not None and os.path.exists(cache_path):
+            master, cached_fingerprint = cls._read_cache(cache_path)
+            if cached_fingerprint == fingerprint:
+                return master
+
+        master = cls.from_csv(data_dir)
+        if cache_path is not None:
+            master.save(cache_path, fingerprint)
+        return master
+
+    def save(self, path, fingerprint=None):
+        """
+        Write the table to an .npz file. fingerprint records which CSVs it was built from.
+        """
+
+        arrays = {name: getattr(self, name) for name in _ARRAYS}
+        np.savez(path, exchanges=np.asarray(self.exchanges, dtype=str), sectors=np.asarray(self.sectors, dtype=str),
+                 fingerprint=np.asarray(json.dumps(fingerprint)), **arrays)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Load a table written by save.
+        """
+
+        return cls._read_cache(path)[0]
+
+    @classmethod
+    def _read_cache(cls, path):
+        with np.load(path, allow_pickle=False) as cache:
+            master = cls(cache['symbols'], cache['names'], cache['exchange_codes'], cache['exchanges'],
+                         cache['sector_codes'], cache['sectors'], cache['is_etf'], cache['in_snp500'],
+                         cache['groups'])
+            return master, json.loads(str(cache['fingerprint']))
+
+    @staticmethod
+    def _codes(categories, values, kind):
+        values = [values] if isinstance(values, str) else list(values)
+        unknown = [value for value in values if value not in categories]
+        if unknown:
+            raise KeyError(f"Unknown {kind} {unknown}. Expected one of {list(categories)}.")
+        return [categories.index(value) for value in values]
+
+
+def _fingerprint(data_dir):
+    """
+    Size and modification time of every source CSV, to tell when a cache is stale.
+    """
+
+    filenames = [listing[0] for listing in EXCHANGE_LISTINGS.values()]
+    filenames += [SNP_INDIVIDUAL_FILE, ETFS_FILE, *SHARE_CLASS_FILES]
+    fingerprint = {}
+    for filename in filenames:
+        path = os.path.join(data_dir, filename)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            fingerprint[filename] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
@@ -1,6 +1,26 @@
 import numpy as np
 
 
+def trend_following_signal(data):
+    """
+    Trend-following signal kernel: buy above the 200-period EMA and sell below it
+    when the combined signal agrees.
+
+    Args:
+        data (DataFrame): Data containing the 200-period EMA and combined signals.
+
+    Returns:
+        ndarray: int8 signal per row (1 buy, -1 sell, 0 flat). data is not modified.
+    """
+
+    combined = data['Combined_Signal'].to_numpy()
+    close = data['Close'].to_numpy()
+    ema = data['EMA_200'].to_numpy()
+    buy = (combined == 1) & (close > ema)
+    sell = (combined == -1) & (close < ema)
+    return buy.astype(np.int8) - (sell & ~buy).astype(np.int8)
+
+
 def trend_following_strategy(data):
     """
     Trend-following strategy using MACD, ADX, and combined signals.
@@ -12,9 +32,6 @@ def trend_following_strategy(data):
         DataFrame: Updated DataFrame with generated signals.
     """
 
-    data['Signal'] = np.where(
-        (data['Combined_Signal'] == 1) & (data['Close'] > data['EMA_200']), 1,  # Buy
-        np.where((data['Combined_Signal'] == -1) & (data['Close'] < data['EMA_200']), -1, 0)  # Sell
-    )
+    data['Signal'] = trend_following_signal(data)
 
     return data
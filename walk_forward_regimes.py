@@ -0,0 +1,145 @@
+"""Walk-forward regime detection without lookahead.
+
+detect_regime.detect_regimes fits one HMM on the whole history, so every label
+depends on future bars. walk_forward_regimes instead splits the history into
+train/test windows, fits a regime_service.RegimeService on each train window
+and labels only the following test window, using forward-filtered (causal)
+probabilities.
+
+The windows are split into runs of run_length consecutive windows, which are
+spread over the worker processes. Within a run each fit warm-starts from the
+previous window's parameters, which cuts the EM iterations of every fit after
+the first. The runs do not depend on the number of workers, so the labels are
+the same on every machine. Regime IDs are kept
+stable inside a run by the service and across runs by matching regime means at
+each run boundary, so the stitched labels form one consistent series.
+
+    data, report = walk_forward_regimes(data, ['Returns', 'Volatility'], train_size=750, test_size=250)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+from regime_service import RegimeService
+
+REPORT_COLUMNS = ['Window', 'Train Start', 'Train End', 'Test Start', 'Test End', 'Bars', 'Seconds',
+                  'Iterations', 'Converged', 'Warm Start']
+
+
+def walk_forward_windows(n_bars, train_size, test_size, expanding=False):
+    """
+    Row ranges of the walk-forward windows.
+
+    Args:
+        n_bars (int): Number of rows in the data.
+        train_size (int): Rows in the first (rolling: every) train window.
+        test_size (int): Rows labelled by each fitted model.
+        expanding (bool): Grow the train window from the first row instead of rolling it.
+
+    Returns:
+        list: (train_start, train_end, test_end) per window; the test window is
+        [train_end, test_end).
+    """
+
+    if train_size <= 0 or test_size <= 0:
+        raise ValueError(f"train_size and test_size must be positive, got {train_size} and {test_size}.")
+    return [(0 if expanding else start - train_size, start, min(start + test_size, n_bars))
+            for start in range(train_size, n_bars, test_size)]
+
+
+def walk_forward_regimes(data, features, train_size, test_size, expanding=False, n_states=3, n_iter=1000,
+                         warm_n_iter=100, warm_start=True, run_length=10, max_workers=None, random_state=42):
+    """
+    Label market regimes out of sample with models refit on rolling or expanding windows.
+
+    Args:
+        data (DataFrame): Data containing the feature columns, in time order.
+        features (list): Feature column names to use for regime detection.
+        train_size (int): Rows in each train window (the first one if expanding).
+        test_size (int): Rows labelled by each window's model.
+        expanding (bool): Use expanding instead of rolling train windows.
+        n_states (int): Number of hidden regimes.
+        n_iter (int): EM iterations of a cold fit.
+        warm_n_iter (int): EM iterations of a warm-started fit.
+        warm_start (bool): Start each fit from the previous window's model. If False
+            every window is fit from scratch and can run in parallel.
+        run_length (int): Consecutive windows per warm-started run; only the first
+            fit of a run is cold. Runs are spread over the workers, and the labels
+            do not depend on max_workers.
+        max_workers (int): Worker processes. Defaults to the CPU count; 1 runs in-process.
+        random_state (int): Seed of the cold fits.
+
+    Returns:
+        DataFrame: data with a 'Regime' column, NaN in the first train window and
+        where a feature is missing.
+        DataFrame: One row per window with its bounds, fit time, EM iterations and convergence.
+    """
+
+    windows = walk_forward_windows(len(data), train_size, test_size, expanding)
+    values = data[features].to_numpy(dtype=float)
+    settings = (list(features), n_states, n_iter, warm_n_iter, random_state)
+
+    if run_length < 1:
+        raise ValueError(f"run_length must be positive, got {run_length}.")
+    max_workers = max_workers or os.cpu_count() or 1
+    if warm_start:
+        runs = [windows[lo:lo + run_length] for lo in range(0, len(windows), run_length)]
+    else:
+        runs = [[window] for window in windows]
+    tasks = [(values[run[0][0]:run[-1][2]], run[0][0], run, settings) for run in runs]
+
+    if max_workers == 1:
+        results = [_fit_run(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_fit_run, tasks))
+
+    regimes = np.full(len(data), np.nan)
+    report = []
+    previous_means = None
+    for run, (run_labels, run_means, fits) in zip(runs, results):
+        # Relabel the run so its first regimes line up with the last regimes of the run before it,
+        # scaling the features by their spread over the run's first train window only.
+        relabel = np.arange(n_states)
+        if previous_means is not None:
+            train_start, train_end, _ = run[0]
+            spread = np.maximum(np.nanstd(values[train_start:train_end], axis=0), np.finfo(float).tiny)
+            cost = (((run_means[0][:, None, :] - previous_means[None, :, :]) / spread) ** 2).sum(axis=2)
+            new_ids, old_ids = linear_sum_assignment(cost)
+            relabel[new_ids] = old_ids
+        previous_means = np.empty_like(run_means[-1])
+        previous_means[relabel] = run_means[-1]
+
+        for (train_start, train_end, test_end), labels, fit in zip(run, run_labels, fits):
+            known = ~np.isnan(labels)
+            labels[known] = relabel[labels[known].astype(int)]
+            regimes[train_end:test_end] = labels
+            report.append([len(report), data.index[train_start], data.index[train_end - 1], data.index[train_end],
+                           data.index[test_end - 1], fit['bars'], fit['seconds'], fit['iterations'],
+                           fit['converged'], fit['warm_start']])
+
+    data['Regime'] = regimes
+    return data, pd.DataFrame(report, columns=REPORT_COLUMNS)
+
+
+def _fit_run(task):
+    values, offset, run, (features, n_states, n_iter, warm_n_iter, random_state) = task
+    frame = pd.DataFrame(values, columns=features)
+    service = RegimeService(features, n_states=n_states, n_iter=n_iter, warm_n_iter=warm_n_iter,
+                            random_state=random_state)
+
+    labels, means = [], []
+    for train_start, train_end, test_end in run:
+        service.fit(frame.iloc[train_start - offset:train_end - offset].copy())
+        # Filter on through the test window so each label only sees earlier bars.
+        window = frame.iloc[train_start - offset:test_end - offset]
+        probabilities = service.filter(window).to_numpy()[train_end - train_start:]
+        window_labels = probabilities.argmax(axis=1).astype(float)
+        window_labels[np.isnan(values[train_end - offset:test_end - offset]).any(axis=1)] = np.nan
+        labels.append(window_labels)
+        means.append(service.regime_means())
+    return labels, means, service.fits